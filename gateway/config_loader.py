@@ -1,20 +1,23 @@
-import configparser
 from pathlib import Path
 
+from fast_config import FastCfg, parse_config
+
 CFG_PATH = Path(__file__).resolve().parent / "config.ini"
 
-def load_config(verbose: bool = False) -> configparser.ConfigParser:
+# Parsed config keyed by path -> (mtime_ns, size, parser); re-parse only when the file changes
+_CACHE: dict[Path, tuple[int, int, FastCfg]] = {}
+
+def load_config(verbose: bool = False) -> FastCfg:
     if not CFG_PATH.exists():
         raise FileNotFoundError(f"Missing config file: {CFG_PATH}")
 
-    cfg = configparser.ConfigParser(
-        interpolation=None,
-        inline_comment_prefixes=("#", ";"),
-    )
+    st = CFG_PATH.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _CACHE.get(CFG_PATH)
+    if cached is not None and cached[0:2] == key and not verbose:
+        return cached[2]
 
-    # IMPORTANT: utf-8-sig handles Windows BOM correctly
-    with CFG_PATH.open("r", encoding="utf-8-sig") as f:
-        cfg.read_file(f)
+    cfg = parse_config(CFG_PATH)
 
     if verbose:
         print(f"[CFG] Loaded from: {CFG_PATH}")
@@ -22,15 +25,25 @@ def load_config(verbose: bool = False) -> configparser.ConfigParser:
         for sec in cfg.sections():
             print(f"[CFG] [{sec}] keys: {list(cfg[sec].keys())}")
 
+    _CACHE[CFG_PATH] = (key[0], key[1], cfg)
     return cfg
 
-def require(cfg: configparser.ConfigParser, section: str, key: str) -> str:
+def _cache_clear() -> None:
+    """Drop the cached parser so the next load_config() re-reads the file."""
+    _CACHE.clear()
+
+load_config.cache_clear = _cache_clear
+
+def require(cfg: FastCfg, section: str, key: str) -> str:
     """Get a required key; raises a clear error if missing."""
-    if not cfg.has_section(section):
-        raise KeyError(f"Missing section [{section}] in {CFG_PATH}. Sections found: {cfg.sections()}")
-    if not cfg.has_option(section, key):
-        raise KeyError(f"Missing key '{key}' in section [{section}] in {CFG_PATH}. Keys found: {list(cfg[section].keys())}")
-    return cfg.get(section, key)
+    try:
+        options = cfg[section]
+    except KeyError:
+        raise KeyError(f"Missing section [{section}] in {CFG_PATH}. Sections found: {cfg.sections()}") from None
+    value = options.get(key.lower())
+    if value is None:
+        raise KeyError(f"Missing key '{key}' in section [{section}] in {CFG_PATH}. Keys found: {list(options.keys())}")
+    return value
 
 
 if __name__ == "__main__":
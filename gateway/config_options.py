@@ -1,7 +1,7 @@
 from dataclasses import dataclass
-from typing import Optional
 
 from config_loader import load_config
+from fast_config import parse_bool
 
 DEFAULT_TCP_HOST = "0.0.0.0"
 DEFAULT_TCP_PORT = 30001
@@ -26,6 +26,7 @@ DEFAULT_STATE_IP = "127.0.0.1"
 DEFAULT_STATE_PORT = 20001
 DEFAULT_CMD_PORT = 20002
 DEFAULT_INFO_PORT = 20003
+DEFAULT_TX_MAX_BATCH = 1  # STATE pkts per sendmmsg(); 1 = send every tick
 
 DEFAULT_CMD_MIN = -100
 DEFAULT_CMD_MAX = 100
@@ -36,6 +37,10 @@ DEFAULT_TEST_MOTOR_STEP = 10
 DEFAULT_TEST_MOTOR_LIMIT = 50
 DEFAULT_TEST_BEEP_PERIOD = 30
 
+DEFAULT_CORE = -1  # -1 = leave the thread unpinned
+DEFAULT_TX_NICE = 0
+DEFAULT_TX_FIFO_PRIO = 0  # 0 = normal scheduler
+
 
 @dataclass
 class TcpConfig:
@@ -82,6 +87,7 @@ class UdpConfig:
     state_port: int
     cmd_port: int
     info_port: int
+    tx_max_batch: int
 
 
 @dataclass
@@ -104,6 +110,16 @@ class TestClientConfig:
     beep_period: int
 
 
+@dataclass
+class ThreadingConfig:
+    main_core: int
+    rx_core: int
+    tx_core: int
+    recorder_core: int
+    tx_nice: int
+    tx_fifo_prio: int
+
+
 @dataclass
 class ConfigOptions:
     tcp: TcpConfig
@@ -115,120 +131,93 @@ class ConfigOptions:
     cmd: CmdConfig
     protocol: ProtocolConfig
     test_client: TestClientConfig
-
-
-def _get(cfg, section: str, key: str, fallback: Optional[str] = None) -> Optional[str]:
-    if cfg.has_option(section, key):
-        return cfg.get(section, key)
-    return fallback
-
-
-def _getint(cfg, section: str, key: str, fallback: int) -> int:
-    if cfg.has_option(section, key):
-        return cfg.getint(section, key)
-    return fallback
-
-
-def _getfloat(cfg, section: str, key: str, fallback: Optional[float]) -> Optional[float]:
-    if cfg.has_option(section, key):
-        return cfg.getfloat(section, key)
-    return fallback
-
-
-def _getbool(cfg, section: str, key: str, fallback: Optional[bool]) -> Optional[bool]:
-    if cfg.has_option(section, key):
-        return cfg.getboolean(section, key)
-    return fallback
+    threading: ThreadingConfig
+
+
+_GROUPS = {
+    "tcp": TcpConfig,
+    "rosmaster": RosmasterConfig,
+    "recorder": RecorderConfig,
+    "logging": LoggingConfig,
+    "timing": TimingConfig,
+    "udp": UdpConfig,
+    "cmd": CmdConfig,
+    "protocol": ProtocolConfig,
+    "test_client": TestClientConfig,
+    "threading": ThreadingConfig,
+}
+
+# (group, field, section, key, type, default, fallback_section, fallback_key)
+# The fallback section/key is read only when the primary key is missing.
+_OPTION_SPECS = (
+    ("tcp", "host", "tcp", "host", str, DEFAULT_TCP_HOST, None, None),
+    ("tcp", "state_port", "tcp", "state_port", int, DEFAULT_TCP_PORT, "tcp", "port"),
+    ("tcp", "cmd_port", "tcp", "cmd_port", int, DEFAULT_TCP_PORT + 1, None, None),
+
+    ("rosmaster", "linux_port", "rosmaster", "linux_port", str, DEFAULT_LINUX_COM_PORT, "rosmaster", "linux_com_port"),
+    ("rosmaster", "windows_port", "rosmaster", "windows_port", str, DEFAULT_WINDOWS_COM_PORT, "rosmaster", "windows_com_port"),
+    ("rosmaster", "baud", "rosmaster", "baud", int, DEFAULT_ROS_BAUD, None, None),
+
+    ("recorder", "recorder_dir", "recorder", "dir", str, DEFAULT_RECORDER_DIR, None, None),
+    ("recorder", "recorder_prefix", "recorder", "prefix", str, DEFAULT_RECORDER_PREFIX, None, None),
+
+    ("logging", "log_dir", "logging", "dir", str, DEFAULT_LOG_DIR, None, None),
+    ("logging", "enable", "logging", "enable", bool, DEFAULT_LOG_ENABLE, None, None),
+    ("logging", "max_size_bytes", "logging", "max_size_bytes", int, DEFAULT_LOG_MAX_SIZE_BYTES, None, None),
+    ("logging", "print_level", "logging", "print_level", str, DEFAULT_LOG_PRINT_LEVEL, None, None),
+    ("logging", "log_level", "logging", "log_level", str, DEFAULT_LOG_LEVEL, None, None),
+
+    ("timing", "rate_hz", "timing", "rate_hz", float, DEFAULT_STATE_RATE, "timming", "rate_hz"),
+    ("timing", "state_hz", "timing", "state_hz", float, DEFAULT_STATE_RATE, "timming", "state_hz"),
+    ("timing", "cmd_timeout_s", "timing", "cmd_timeout_s", float, DEFAULT_CMD_TIMEOUT_S, "cmd", "timeout"),
+    ("timing", "duration", "timing", "duration", float, DEFAULT_DURATION, None, None),
+
+    ("udp", "local_ip", "udp", "local_ip", str, DEFAULT_STATE_IP, None, None),
+    ("udp", "pc_ip", "udp", "pc_ip", str, DEFAULT_STATE_IP, None, None),
+    ("udp", "rpi_ip", "udp", "rpi_ip", str, DEFAULT_STATE_IP, None, None),
+    ("udp", "state_port", "udp", "state_port", int, DEFAULT_STATE_PORT, None, None),
+    ("udp", "cmd_port", "udp", "cmd_port", int, DEFAULT_CMD_PORT, None, None),
+    ("udp", "info_port", "udp", "info_port", int, DEFAULT_INFO_PORT, None, None),
+    ("udp", "tx_max_batch", "udp", "tx_max_batch", int, DEFAULT_TX_MAX_BATCH, None, None),
+
+    ("cmd", "min", "cmd", "min", int, DEFAULT_CMD_MIN, None, None),
+    ("cmd", "max", "cmd", "max", int, DEFAULT_CMD_MAX, None, None),
+    ("cmd", "timeout", "cmd", "timeout", float, DEFAULT_CMD_TIMEOUT_S, None, None),
+
+    ("protocol", "flag_beep_once", "protocol", "flag_beep_once", int, DEFAULT_FLAG_BEEP_ONCE, None, None),
+
+    ("test_client", "cmd_rate_hz", "test_client", "cmd_rate_hz", float, DEFAULT_TEST_CMD_RATE_HZ, None, None),
+    ("test_client", "motor_step", "test_client", "motor_step", int, DEFAULT_TEST_MOTOR_STEP, None, None),
+    ("test_client", "motor_limit", "test_client", "motor_limit", int, DEFAULT_TEST_MOTOR_LIMIT, None, None),
+    ("test_client", "beep_period", "test_client", "beep_period", int, DEFAULT_TEST_BEEP_PERIOD, None, None),
+
+    ("threading", "main_core", "threading", "main_core", int, DEFAULT_CORE, None, None),
+    ("threading", "rx_core", "threading", "rx_core", int, DEFAULT_CORE, None, None),
+    ("threading", "tx_core", "threading", "tx_core", int, DEFAULT_CORE, None, None),
+    ("threading", "recorder_core", "threading", "recorder_core", int, DEFAULT_CORE, None, None),
+    ("threading", "tx_nice", "threading", "tx_nice", int, DEFAULT_TX_NICE, None, None),
+    ("threading", "tx_fifo_prio", "threading", "tx_fifo_prio", int, DEFAULT_TX_FIFO_PRIO, None, None),
+)
+
+
+_CASTS = {str: str, int: int, float: float, bool: parse_bool}
 
 
 def load_config_options() -> ConfigOptions:
     cfg = load_config()
-
-    tcp_host = _get(cfg, "tcp", "host", DEFAULT_TCP_HOST) or DEFAULT_TCP_HOST
-    tcp_state_port = _getint(cfg, "tcp", "state_port", None)
-    if tcp_state_port is None:
-        tcp_state_port = _getint(cfg, "tcp", "port", DEFAULT_TCP_PORT)
-    tcp_cmd_port = _getint(cfg, "tcp", "cmd_port", DEFAULT_TCP_PORT + 1)
-
-    linux_port = _get(cfg, "rosmaster", "linux_port", None)
-    if linux_port is None:
-        linux_port = _get(cfg, "rosmaster", "linux_com_port", DEFAULT_LINUX_COM_PORT)
-    windows_port = _get(cfg, "rosmaster", "windows_port", None)
-    if windows_port is None:
-        windows_port = _get(cfg, "rosmaster", "windows_com_port", DEFAULT_WINDOWS_COM_PORT)
-    baud = _getint(cfg, "rosmaster", "baud", DEFAULT_ROS_BAUD)
-
-    timing_rate_hz = _getfloat(cfg, "timing", "rate_hz", None)
-    if timing_rate_hz is None:
-        timing_rate_hz = _getfloat(cfg, "timming", "rate_hz", DEFAULT_STATE_RATE)
-    state_hz = _getfloat(cfg, "timing", "state_hz", None)
-    if state_hz is None:
-        state_hz = _getfloat(cfg, "timming", "state_hz", DEFAULT_STATE_RATE)
-    cmd_timeout_s = _getfloat(cfg, "timing", "cmd_timeout_s", None)
-    if cmd_timeout_s is None:
-        cmd_timeout_s = _getfloat(cfg, "cmd", "timeout", DEFAULT_CMD_TIMEOUT_S)
-    duration = _getfloat(cfg, "timing", "duration", DEFAULT_DURATION)
-
-    recorder_dir = _get(cfg, "recorder", "dir", DEFAULT_RECORDER_DIR) or DEFAULT_RECORDER_DIR
-    recorder_prefix = _get(cfg, "recorder", "prefix", DEFAULT_RECORDER_PREFIX) or DEFAULT_RECORDER_PREFIX
-
-    log_dir = _get(cfg, "logging", "dir", DEFAULT_LOG_DIR) or DEFAULT_LOG_DIR
-    log_enable = _getbool(cfg, "logging", "enable", DEFAULT_LOG_ENABLE)
-    if log_enable is None:
-        log_enable = DEFAULT_LOG_ENABLE
-    log_max_size_bytes = _getint(cfg, "logging", "max_size_bytes", DEFAULT_LOG_MAX_SIZE_BYTES)
-    log_print_level = _get(cfg, "logging", "print_level", DEFAULT_LOG_PRINT_LEVEL) or DEFAULT_LOG_PRINT_LEVEL
-    log_level = _get(cfg, "logging", "log_level", DEFAULT_LOG_LEVEL) or DEFAULT_LOG_LEVEL
-
-    local_ip = _get(cfg, "udp", "local_ip", DEFAULT_STATE_IP) or DEFAULT_STATE_IP
-    pc_ip = _get(cfg, "udp", "pc_ip", DEFAULT_STATE_IP) or DEFAULT_STATE_IP
-    rpi_ip = _get(cfg, "udp", "rpi_ip", DEFAULT_STATE_IP) or DEFAULT_STATE_IP
-    state_port = _getint(cfg, "udp", "state_port", DEFAULT_STATE_PORT)
-    cmd_port = _getint(cfg, "udp", "cmd_port", DEFAULT_CMD_PORT)
-    info_port = _getint(cfg, "udp", "info_port", DEFAULT_INFO_PORT)
-
-    cmd_min = _getint(cfg, "cmd", "min", DEFAULT_CMD_MIN)
-    cmd_max = _getint(cfg, "cmd", "max", DEFAULT_CMD_MAX)
-    cmd_timeout = _getfloat(cfg, "cmd", "timeout", DEFAULT_CMD_TIMEOUT_S)
-
-    flag_beep_once = _getint(cfg, "protocol", "flag_beep_once", DEFAULT_FLAG_BEEP_ONCE)
-
-    cmd_rate_hz = _getfloat(cfg, "test_client", "cmd_rate_hz", DEFAULT_TEST_CMD_RATE_HZ)
-    motor_step = _getint(cfg, "test_client", "motor_step", DEFAULT_TEST_MOTOR_STEP)
-    motor_limit = _getint(cfg, "test_client", "motor_limit", DEFAULT_TEST_MOTOR_LIMIT)
-    beep_period = _getint(cfg, "test_client", "beep_period", DEFAULT_TEST_BEEP_PERIOD)
-
-    return ConfigOptions(
-        tcp=TcpConfig(host=tcp_host, state_port=tcp_state_port, cmd_port=tcp_cmd_port),
-        rosmaster=RosmasterConfig(linux_port=linux_port, windows_port=windows_port, baud=baud),
-        recorder=RecorderConfig(recorder_dir=recorder_dir, recorder_prefix=recorder_prefix),
-        logging=LoggingConfig(
-            log_dir=log_dir,
-            enable=log_enable,
-            max_size_bytes=log_max_size_bytes,
-            print_level=log_print_level,
-            log_level=log_level,
-        ),
-        timing=TimingConfig(
-            rate_hz=timing_rate_hz,
-            state_hz=state_hz,
-            cmd_timeout_s=cmd_timeout_s,
-            duration=duration,
-        ),
-        udp=UdpConfig(
-            local_ip=local_ip,
-            pc_ip=pc_ip,
-            rpi_ip=rpi_ip,
-            state_port=state_port,
-            cmd_port=cmd_port,
-            info_port=info_port,
-        ),
-        cmd=CmdConfig(min=cmd_min, max=cmd_max, timeout=cmd_timeout),
-        protocol=ProtocolConfig(flag_beep_once=flag_beep_once),
-        test_client=TestClientConfig(
-            cmd_rate_hz=cmd_rate_hz,
-            motor_step=motor_step,
-            motor_limit=motor_limit,
-            beep_period=beep_period,
-        ),
-    )
+    # Look options up in the parsed section dicts directly instead of going through cfg.get*()
+    sections = {name: cfg[name] for name in cfg.sections()}
+    empty = {}
+
+    values = {group: {} for group in _GROUPS}
+    for group, name, section, key, typ, default, alt_section, alt_key in _OPTION_SPECS:
+        options = sections.get(section, empty)
+        if alt_section is not None and key not in options:
+            options, key = sections.get(alt_section, empty), alt_key
+        raw = options.get(key)
+        value = default if raw is None else _CASTS[typ](raw)
+        if typ is str and not value:
+            value = default
+        values[group][name] = value
+
+    return ConfigOptions(**{group: cls(**values[group]) for group, cls in _GROUPS.items()})
@@ -0,0 +1,41 @@
+# cpu_affinity.py
+"""
+Per-thread CPU pinning and priority for the real-time loops.
+
+On Linux, sched_setaffinity(0, ...), setpriority(PRIO_PROCESS, 0, ...) and
+sched_setscheduler(0, ...) act on the calling thread only, so each loop pins
+itself when it starts. New threads and child processes inherit the creator's
+mask, which is why every loop sets its own. A negative core leaves the thread
+unpinned and a zero fifo_prio keeps the normal scheduler; failures (no such
+core, no CAP_SYS_NICE for a negative nice or SCHED_FIFO) are logged and
+otherwise ignored. For the lowest jitter the pinned cores should also be kept
+free of other tasks (isolcpus= on the kernel command line).
+"""
+import os
+
+import logger as log
+
+UNPINNED = -1
+
+
+def pin_current_thread(name: str, core: int, nice: int = 0, fifo_prio: int = 0) -> None:
+    if core >= 0 and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {core})
+        except OSError as exc:
+            log.warn(f"{name}: cannot pin to core {core}: {exc}")
+        else:
+            log.info(f"{name}: pinned to core {core}")
+    if nice and hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, nice)
+        except OSError as exc:
+            log.warn(f"{name}: cannot set nice {nice}: {exc}")
+    if fifo_prio > 0 and hasattr(os, "sched_setscheduler"):
+        # Real-time FIFO: preempts every normal task on the core, so only for the pacing loop
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(fifo_prio))
+        except OSError as exc:
+            log.warn(f"{name}: cannot set SCHED_FIFO priority {fifo_prio}: {exc}")
+        else:
+            log.info(f"{name}: SCHED_FIFO priority {fifo_prio}")
@@ -1,6 +1,7 @@
 #csv_recorder.py
 import csv
 import os
+import time
 from datetime import datetime
 from typing import Dict, Iterable
 
@@ -29,16 +30,29 @@ StatesHeader = [
     "enc4",
 ]
 
+# Pre-joined row templates (columns follow ActionsHeader / StatesHeader).
+# Rows end with "\r\n" to match csv.writer's default excel dialect.
+# %-style so a whole batch can be formatted in one call: (FMT * n) % fields
+ACTIONS_ROW_FMT = ",".join(["%.6f"] * 2 + ["%d"] * 6) + "\r\n"
+STATES_ROW_FMT = ",".join(["%.6f"] * 14 + ["%d"] * 4) + "\r\n"
+
+# Rows are appended to a block of this size and reach the disk in one write()
+# when it fills or every flush_interval_s, instead of one small write per drain
+WRITE_BLOCK_BYTES = 64 * 1024
+
+# Recorder directories already created by this process
+_ENSURED_DIRS = set()
+
 def actions_to_dict(t_wall_s: float, t_mono_s: float, actions: Actions) -> Dict[str, object]:
     row = {
         "t_epoch_s": f"{t_wall_s:.6f}",
         "t_mono_s": f"{t_mono_s:.6f}",
-        "m1": int(actions.motors.m1),
-        "m2": int(actions.motors.m2),
-        "m3": int(actions.motors.m3),
-        "m4": int(actions.motors.m4),
-        "beep_ms": int(actions.beep_ms),
-        "flags": int(actions.flags),
+        "m1": actions.motors.m1,
+        "m2": actions.motors.m2,
+        "m3": actions.motors.m3,
+        "m4": actions.motors.m4,
+        "beep_ms": actions.beep_ms,
+        "flags": actions.flags,
     }
     return row
 
@@ -58,23 +72,54 @@ def state_to_dict(t_wall_s: float, t_mono_s: float, state: States) -> Dict[str,
         "roll_deg": f"{state.ang.roll:.6f}",
         "pitch_deg": f"{state.ang.pitch:.6f}",
         "yaw_deg": f"{state.ang.yaw:.6f}",
-        "enc1": int(state.enc.e1),
-        "enc2": int(state.enc.e2),
-        "enc3": int(state.enc.e3),
-        "enc4": int(state.enc.e4),
+        "enc1": state.enc.e1,
+        "enc2": state.enc.e2,
+        "enc3": state.enc.e3,
+        "enc4": state.enc.e4,
     }
     return row
 
+def actions_to_fields(t_wall_s: float, t_mono_s: float, actions: Actions) -> tuple:
+    m = actions.motors
+    return (t_wall_s, t_mono_s, m.m1, m.m2, m.m3, m.m4, actions.beep_ms, actions.flags)
+
+def state_to_fields(t_wall_s: float, t_mono_s: float, state: States) -> tuple:
+    imu, ang, enc = state.imu, state.ang, state.enc
+    return (
+        t_wall_s, t_mono_s,
+        imu.acc.x, imu.acc.y, imu.acc.z,
+        imu.gyro.x, imu.gyro.y, imu.gyro.z,
+        imu.mag.x, imu.mag.y, imu.mag.z,
+        ang.roll, ang.pitch, ang.yaw,
+        enc.e1, enc.e2, enc.e3, enc.e4,
+    )
+
+def actions_to_row(t_wall_s: float, t_mono_s: float, actions: Actions) -> str:
+    return ACTIONS_ROW_FMT % actions_to_fields(t_wall_s, t_mono_s, actions)
+
+def state_to_row(t_wall_s: float, t_mono_s: float, state: States) -> str:
+    return STATES_ROW_FMT % state_to_fields(t_wall_s, t_mono_s, state)
+
+def format_rows(row_fmt: str, fields: list, count: int) -> str:
+    """Format count rows from their flattened fields with a single %-format call."""
+    return (row_fmt * count) % tuple(fields)
+
 class CSVRecorder:
-    def __init__(self, recorderdir: str, prefix: str, header: Iterable[str]):
+    def __init__(self, recorderdir: str, prefix: str, header: Iterable[str], flush_interval_s: float = 1.0,
+                 write_block_bytes: int = WRITE_BLOCK_BYTES):
         self.header = list(header)
         self.csv_path = self._build_path(recorderdir, prefix)
+        self.flush_interval_s = flush_interval_s
+        self.write_block_bytes = write_block_bytes
         self._file = None
         self._writer = None
+        self._last_flush = 0.0
         
     def _build_path(self, recorderdir: str, prefix: str) -> str:
         stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        os.makedirs(recorderdir, exist_ok=True)
+        if recorderdir not in _ENSURED_DIRS:
+            os.makedirs(recorderdir, exist_ok=True)
+            _ENSURED_DIRS.add(recorderdir)
         filename = f"{prefix}_{stamp}.csv" if prefix else f"{stamp}.csv"
         csv_path = os.path.join(recorderdir, filename)
         log.info(f"Recording to: {csv_path}")
@@ -83,15 +128,37 @@ class CSVRecorder:
     def open(self) -> "CSVRecorder":
         if self._file is not None:
             return self
-        self._file = open(self.csv_path, "w", newline="", buffering=1, encoding="utf-8")
+        # Block buffering; rows are flushed when a block fills, every flush_interval_s and on close()
+        self._file = open(self.csv_path, "w", newline="", buffering=self.write_block_bytes, encoding="utf-8")
         self._writer = csv.DictWriter(self._file, fieldnames=self.header)
         self._writer.writeheader()
+        self._last_flush = time.monotonic()
         return self
 
+    def _maybe_flush(self) -> None:
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval_s:
+            self._file.flush()
+            self._last_flush = now
+
     def record(self, raw_dict: Dict[str, object]) -> None:
         if self._writer is None:
             raise RuntimeError("CSVRecorder is not open. Use 'with CSVRecorder(...)' or call open().")
         self._writer.writerow(raw_dict)
+        self._maybe_flush()
+
+    def record_actions(self, t_wall_s: float, t_mono_s: float, actions: Actions) -> None:
+        self.write_rows(actions_to_row(t_wall_s, t_mono_s, actions))
+
+    def record_state(self, t_wall_s: float, t_mono_s: float, state: States) -> None:
+        self.write_rows(state_to_row(t_wall_s, t_mono_s, state))
+
+    def write_rows(self, rows: str) -> None:
+        """Write one or more already formatted rows (see *_to_row) in a single write()."""
+        if self._file is None:
+            raise RuntimeError("CSVRecorder is not open. Use 'with CSVRecorder(...)' or call open().")
+        self._file.write(rows)
+        self._maybe_flush()
 
     def __enter__(self):
         return self.open()
@@ -102,8 +169,5 @@ class CSVRecorder:
         self._file = None
         self._writer = None
 
-    def __del__(self):
-        self.close()
-
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
@@ -0,0 +1,101 @@
+# fast_config.py
+"""
+Minimal INI parser for config.ini.
+
+Supports only what config.ini uses: [section] headers, key = value (or key: value)
+lines, and full-line / inline '#' ';' comments. No interpolation, no multiline values.
+Keys are lower-cased like configparser's default optionxform.
+"""
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+SECTION_RE = re.compile(r"^\s*\[([^\]]+)\]\s*$")
+KV_RE = re.compile(r"^\s*([^=:#;\s][^=:]*?)\s*[=:]\s*(.*?)(?:\s+[#;].*)?\s*$")
+
+BOOLEAN_STATES = {
+    "1": True, "yes": True, "true": True, "on": True,
+    "0": False, "no": False, "false": False, "off": False,
+}
+
+_UNSET = object()
+
+
+def parse_bool(value: str) -> bool:
+    """Convert an INI boolean string ('true', 'off', '1', ...) like ConfigParser.getboolean."""
+    try:
+        return BOOLEAN_STATES[value.lower()]
+    except KeyError:
+        raise ValueError(f"Not a boolean: {value}") from None
+
+
+class FastCfg:
+    """Read-only subset of the configparser.ConfigParser API over nested dicts."""
+
+    def __init__(self, data: Dict[str, Dict[str, str]]):
+        self._d = data
+
+    def sections(self) -> List[str]:
+        return list(self._d)
+
+    def has_section(self, section: str) -> bool:
+        return section in self._d
+
+    def has_option(self, section: str, key: str) -> bool:
+        return key.lower() in self._d.get(section, {})
+
+    def items(self, section: str) -> List[Tuple[str, str]]:
+        return list(self._d[section].items())
+
+    def __getitem__(self, section: str) -> Dict[str, str]:
+        return self._d[section]
+
+    def get(self, section: str, key: str, fallback=_UNSET) -> Optional[str]:
+        sec = self._d.get(section)
+        if sec is None:
+            if fallback is _UNSET:
+                raise KeyError(f"No section: [{section}]")
+            return fallback
+        value = sec.get(key.lower(), _UNSET)
+        if value is _UNSET:
+            if fallback is _UNSET:
+                raise KeyError(f"No option '{key}' in section [{section}]")
+            return fallback
+        return value
+
+    def getint(self, section: str, key: str, fallback=_UNSET) -> int:
+        value = self.get(section, key, fallback)
+        return value if value is fallback else int(value)
+
+    def getfloat(self, section: str, key: str, fallback=_UNSET) -> float:
+        value = self.get(section, key, fallback)
+        return value if value is fallback else float(value)
+
+    def getboolean(self, section: str, key: str, fallback=_UNSET) -> bool:
+        value = self.get(section, key, fallback)
+        return value if value is fallback else parse_bool(value)
+
+
+def parse_config(path: Path) -> FastCfg:
+    """Parse an INI file in one pass into a FastCfg."""
+    data: Dict[str, Dict[str, str]] = {}
+    current: Optional[Dict[str, str]] = None
+
+    # IMPORTANT: utf-8-sig handles Windows BOM correctly
+    with path.open("r", encoding="utf-8-sig") as f:
+        for lineno, line in enumerate(f, start=1):
+            stripped = line.strip()
+            if not stripped or stripped[0] in "#;":
+                continue
+            m = SECTION_RE.match(line)
+            if m:
+                current = data.setdefault(m.group(1).strip(), {})
+                continue
+            m = KV_RE.match(line)
+            if m is None:
+                raise ValueError(f"{path}:{lineno}: cannot parse line: {stripped!r}")
+            if current is None:
+                raise ValueError(f"{path}:{lineno}: key outside of any [section]")
+            current[m.group(1).lower()] = m.group(2)
+
+    return FastCfg(data)
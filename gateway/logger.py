@@ -1,8 +1,8 @@
+import collections
 import os
+import sys
 import threading
-import queue
 import time
-import inspect
 from datetime import datetime
 
 # -----------------------------
@@ -11,8 +11,12 @@ from datetime import datetime
 
 ENABLE_FILE_LOGGING = True
 LOG_DIR = "logs"
+LOG_FILE_TAG = ""  # added to the file names of a second process, so each file has one writer
 MAX_LOG_SIZE_BYTES = 1_000_000  # 1 MB per file before rotation
 MSG_COUNTER = 0
+LOG_RING_SIZE = 4096  # pending file-log entries; oldest are dropped (and counted) when full
+LOG_BATCH_MAX = 256  # entries coalesced per worker pass
+LOG_DROP_REPORT_S = 1.0  # at most one "ring full" warning per interval
 DATE_STR = datetime.now().strftime("%Y-%m-%d_%H-%M")
 
 # Log levels
@@ -29,6 +33,8 @@ LOGGING_LEVEL = LEVELS["DEBUG"]  # All levels will be logged to file
 #-------------------------------------------------------------
 
 LOG_FILES = {}
+_log_fds = {}    # level -> (path, unbuffered append-mode file), owned by the worker thread
+_log_sizes = {}  # level -> bytes in the current file, for rotation without stat() (this process is its only writer)
 _initialized = False
 _worker_started = False
 
@@ -41,8 +47,14 @@ COLORS = {
     "END":   "\033[0m"
 }
 
-# Thread-safe queue for async logging
-log_queue = queue.Queue()
+# Bounded ring for async logging: deque.append/popleft are atomic under the GIL,
+# so producers take no lock. The worker sleeps on _log_wakeup while the ring is
+# empty; a producer sets it only if the worker has not been signalled since it
+# last cleared it, i.e. once per empty->non-empty transition.
+log_queue = collections.deque(maxlen=LOG_RING_SIZE)
+_log_wakeup = threading.Event()
+_dropped = 0  # entries pushed out of the full ring; reported by the worker
+_drop_lock = threading.Lock()  # only taken on the (rare) drop path
 stop_signal = False
 
 # -----------------------------
@@ -50,12 +62,13 @@ stop_signal = False
 # -----------------------------
 
 def _build_log_files():
-    """Update log file paths based on current LOG_DIR and DATE_STR."""
+    """Update log file paths based on current LOG_DIR, DATE_STR and LOG_FILE_TAG."""
+    stem = f"{DATE_STR}_{LOG_FILE_TAG}" if LOG_FILE_TAG else DATE_STR
     return {
-        "ERROR": os.path.join(LOG_DIR, f"{DATE_STR}_error.log"),
-        "WARN":  os.path.join(LOG_DIR, f"{DATE_STR}_warn.log"),
-        "INFO":  os.path.join(LOG_DIR, f"{DATE_STR}_info.log"),
-        "DEBUG": os.path.join(LOG_DIR, f"{DATE_STR}_debug.log"),
+        "ERROR": os.path.join(LOG_DIR, f"{stem}_error.log"),
+        "WARN":  os.path.join(LOG_DIR, f"{stem}_warn.log"),
+        "INFO":  os.path.join(LOG_DIR, f"{stem}_info.log"),
+        "DEBUG": os.path.join(LOG_DIR, f"{stem}_debug.log"),
     }
 
 def _start_worker_if_needed():
@@ -76,14 +89,6 @@ def _ensure_initialized():
     LOG_FILES = _build_log_files()
     _initialized = True
 
-def _create_log_files():
-    """Create log files if they don't exist."""
-    _ensure_initialized()
-    for log_file in LOG_FILES.values():
-        if not os.path.exists(log_file):
-            with open(log_file, "w") as f:
-                pass  # just create the file
-
 # def _name_log_files_with_current_date():
 #     """Rename log files to include the current date."""
 #     DATE_STR = datetime.now().strftime("%Y%m%d")
@@ -103,52 +108,104 @@ def _create_log_files():
 #     _create_log_files()
 #     MSG_COUNTER = 0
            
-def _rotate_if_needed(log_file):
+def _open_log_file(level):
+    """Return the persistent append-mode handle for level, (re)opening it if its path changed."""
+    path = LOG_FILES[level]
+    entry = _log_fds.get(level)
+    if entry is not None:
+        if entry[0] == path:
+            return entry[1]
+        entry[1].close()
+    f = open(path, "ab", buffering=0)
+    _log_fds[level] = (path, f)
+    _log_sizes[level] = os.fstat(f.fileno()).st_size
+    return f
+
+def _close_log_files():
+    for _, f in _log_fds.values():
+        f.close()
+    _log_fds.clear()
+    _log_sizes.clear()
+
+def _rotate_if_needed(level):
     """Rotate log file if it exceeds MAX_LOG_SIZE_BYTES."""
-    if os.path.exists(log_file) and os.path.getsize(log_file) > MAX_LOG_SIZE_BYTES:
-        base, ext = os.path.splitext(log_file)
-
-        # Find next free rotated filename
-        i = 1
-        while True:
-            rotated = f"{base}_{i}{ext}"
-            if not os.path.exists(rotated):
-                os.rename(log_file, rotated)
-                break
-            i += 1
+    if level not in _log_fds or _log_sizes[level] <= MAX_LOG_SIZE_BYTES:
+        return
+    log_file, f = _log_fds.pop(level)
+    f.close()
+    base, ext = os.path.splitext(log_file)
+
+    # Find next free rotated filename
+    i = 1
+    while True:
+        rotated = f"{base}_{i}{ext}"
+        if not os.path.exists(rotated):
+            os.rename(log_file, rotated)
+            break
+        i += 1
+
+def _format_line(level, message):
+    global MSG_COUNTER
+    MSG_COUNTER += 1
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    return f"{MSG_COUNTER:06d} [{timestamp}] [{level}] {message}\n"
 
 def _async_log_worker():
     """Background thread that processes queued log entries."""
-    global stop_signal, MSG_COUNTER
-    while not stop_signal or not log_queue.empty():
-        try:
-            level, message = log_queue.get(timeout=0.5)
-        except queue.Empty:
-            continue
-
-        _ensure_initialized()
-        log_file = LOG_FILES[level]
-        # _create_log_files_if_needed() 
-        _rotate_if_needed(log_file)  # rotate file if needed
-
-        MSG_COUNTER += 1
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_line = f"{MSG_COUNTER:06d} [{timestamp}] [{level}] {message}\n"
-
-        # Thread-safe file write
-        with open(log_file, "a") as f:
-            f.write(log_line)
+    reported = 0
+    next_report = 0.0
+    while True:
+        # Blocks while idle; cleared before draining so a push made after this point sets it again
+        _log_wakeup.wait()
+        _log_wakeup.clear()
+
+        while log_queue:
+            _ensure_initialized()
+            # Coalesce whatever is pending into one write() per level
+            lines = {}
+            for _ in range(LOG_BATCH_MAX):
+                try:
+                    level, message = log_queue.popleft()
+                except IndexError:
+                    break
+                lines.setdefault(level, []).append(_format_line(level, message))
+
+            dropped = _dropped
+            if dropped != reported and (stop_signal or time.monotonic() >= next_report):
+                next_report = time.monotonic() + LOG_DROP_REPORT_S
+                lost = f"(logger.py) log ring full: dropped {dropped - reported} entries ({dropped} total) "
+                lines.setdefault("WARN", []).append(_format_line("WARN", lost))
+                print(f"{COLORS['WARN']}[WARN] {lost}{COLORS['END']}")
+                reported = dropped
+
+            for level, level_lines in lines.items():
+                _rotate_if_needed(level)  # rotate file if needed
+                data = "".join(level_lines).encode()
+                # O_APPEND handle kept open: no open/close per message
+                _open_log_file(level).write(data)
+                _log_sizes[level] += len(data)
+
+        if stop_signal:
+            break
+
+    _close_log_files()
+
+_BASENAMES = {}  # co_filename -> basename, filled on first call from each file
 
 def _get_caller():
     """
     Return accurate caller even when the logging API is nested.
+    Walks frames directly: no FrameInfo list, no source-file reads.
     """
-    stack = inspect.stack()
-
-    for frame in stack:
-        fname = os.path.basename(frame.filename)
+    f = sys._getframe(1)
+    while f is not None:
+        filename = f.f_code.co_filename
+        fname = _BASENAMES.get(filename)
+        if fname is None:
+            fname = _BASENAMES[filename] = os.path.basename(filename)
         if fname != "logger.py":        # skip internal logger calls
-            return f"{fname}:{frame.lineno}"
+            return f"{fname}:{f.f_lineno}"
+        f = f.f_back
 
     return "unknown:0"
 
@@ -212,19 +269,68 @@ def set_file_logging_enabled(enabled):
     ENABLE_FILE_LOGGING = enabled
     _initialized = False
 
-def debug(message): trace("DEBUG", message)
-def info(message): trace("INFO", message)
-def warn(message): trace("WARN", message)
-def error(message): trace("ERROR", message)
+def set_file_tag(tag):
+    """Name this process's log files <date>_<tag>_<level>.log, e.g. for the recorder process."""
+    global LOG_FILE_TAG, _initialized
+    LOG_FILE_TAG = tag.strip()
+    _initialized = False
+
+def get_settings():
+    """Current configuration, for handing to a spawned child process (see apply_settings)."""
+    return {
+        "enable": ENABLE_FILE_LOGGING,
+        "dir": LOG_DIR,
+        "date": DATE_STR,
+        "max_size": MAX_LOG_SIZE_BYTES,
+        "print_level": PRINT_LEVEL,
+        "log_level": LOGGING_LEVEL,
+    }
 
-def trace(level, message):
+def apply_settings(settings):
+    """Re-apply get_settings() output in a child, so it logs to the parent's files and levels."""
+    global DATE_STR
+    DATE_STR = settings["date"]
+    set_file_logging_enabled(settings["enable"])
+    set_max_file_size(settings["max_size"])
+    set_print_level(settings["print_level"])
+    set_log_level(settings["log_level"])
+    set_logs_dir(settings["dir"])
+
+def enabled(level):
+    """True if a message at level would be printed or written to file."""
+    lvl = LEVELS[level.upper()]
+    return lvl >= PRINT_LEVEL or (ENABLE_FILE_LOGGING and lvl >= LOGGING_LEVEL)
+
+def debug_enabled():
+    """Guard for hot paths: skip building DEBUG message arguments when they would be dropped."""
+    return LEVELS["DEBUG"] >= PRINT_LEVEL or (ENABLE_FILE_LOGGING and LEVELS["DEBUG"] >= LOGGING_LEVEL)
+
+def debug(message, *args): trace("DEBUG", message, *args)
+def info(message, *args): trace("INFO", message, *args)
+def warn(message, *args): trace("WARN", message, *args)
+def error(message, *args): trace("ERROR", message, *args)
+
+def trace(level, message, *args):
     """
     Print to terminal (with colors) and store in log file (async).
     Includes filename + line number automatically.
+    Optional args are %-formatted into message only if the level is enabled.
     """
-    level = level.upper()
-    if level not in LEVELS:
-        raise ValueError(f"Invalid log level: {level}")
+    global _dropped
+    lvl = LEVELS.get(level)
+    if lvl is None:
+        level = level.upper()
+        lvl = LEVELS.get(level)
+        if lvl is None:
+            raise ValueError(f"Invalid log level: {level}")
+
+    # Decide before any formatting / caller lookup: dropped messages cost two compares
+    to_print = lvl >= PRINT_LEVEL
+    to_file = ENABLE_FILE_LOGGING and lvl >= LOGGING_LEVEL
+    if not (to_print or to_file):
+        return
+    if args:
+        message = message % args
 
     caller = _get_caller()
 
@@ -232,15 +338,21 @@ def trace(level, message):
     context_msg = f"({caller}) {message} "
 
     # TERMINAL PRINTING (with color)
-    if LEVELS[level] >= PRINT_LEVEL:
+    if to_print:
         color = COLORS[level]
         print(f"{color}[{level}] {context_msg}{COLORS['END']}")
     
     # FILE LOGGING
-    if ENABLE_FILE_LOGGING and LEVELS[level] >= LOGGING_LEVEL:
+    if to_file:
         _ensure_initialized()
-        # Put into async log queue
-        log_queue.put((level, context_msg))
+        if len(log_queue) >= LOG_RING_SIZE:
+            # The append below pushes out the oldest entry: count it for the worker to report
+            with _drop_lock:
+                _dropped += 1
+        # Put into async log ring
+        log_queue.append((level, context_msg))
+        if not _log_wakeup.is_set():
+            _log_wakeup.set()
 
 # -----------------------------
 # CLEAN SHUTDOWN (optional)
@@ -250,5 +362,6 @@ def close_logger():
     """Flush and stop logging thread cleanly (call on shutdown)."""
     global stop_signal
     stop_signal = True
+    _log_wakeup.set()
     if _worker_started:
         log_thread.join(timeout=2)
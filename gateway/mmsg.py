@@ -0,0 +1,145 @@
+# mmsg.py
+"""
+ctypes bindings for Linux recvmmsg()/sendmmsg(): read or send several UDP
+datagrams per syscall. The stdlib socket module has no wrapper for either.
+
+HAVE_MMSG is False where libc lacks them (non-Linux); callers fall back to
+one recvfrom()/sendto() per packet.
+"""
+import ctypes
+import ctypes.util
+import errno
+import socket
+from typing import List
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    _recvmmsg = _libc.recvmmsg
+    _sendmmsg = _libc.sendmmsg
+    HAVE_MMSG = True
+except (OSError, AttributeError):
+    HAVE_MMSG = False
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+
+if HAVE_MMSG:
+    _recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    _recvmmsg.restype = ctypes.c_int
+    _sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    _sendmmsg.restype = ctypes.c_int
+
+
+def _raise_errno() -> None:
+    err = ctypes.get_errno()
+    raise OSError(err, errno.errorcode.get(err, "error"))
+
+
+class RecvBatch:
+    """Preallocated recvmmsg() vector of max_msgs buffers of buf_size bytes each."""
+
+    def __init__(self, max_msgs: int, buf_size: int):
+        self.max_msgs = max_msgs
+        self._bufs = (ctypes.c_char * (max_msgs * buf_size))()
+        self._mv = memoryview(self._bufs).cast("B")
+        self._iovs = (_IoVec * max_msgs)()
+        self._msgs = (_MMsgHdr * max_msgs)()
+        self._slices = []
+        base = ctypes.addressof(self._bufs)
+        for i in range(max_msgs):
+            self._iovs[i].iov_base = base + i * buf_size
+            self._iovs[i].iov_len = buf_size
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+            self._slices.append(self._mv[i * buf_size:(i + 1) * buf_size])
+
+    def recv(self, sock: socket.socket, pkt_size: int) -> List[memoryview]:
+        """
+        Read every queued datagram (up to max_msgs) without blocking.
+        Returns views of the ones that are exactly pkt_size bytes; they stay valid until the next recv().
+        """
+        n = _recvmmsg(sock.fileno(), self._msgs, self.max_msgs, socket.MSG_DONTWAIT, None)
+        if n < 0:
+            if ctypes.get_errno() in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return []
+            _raise_errno()
+        msgs, slices = self._msgs, self._slices
+        return [slices[i][:pkt_size] for i in range(n) if msgs[i].msg_len == pkt_size]
+
+
+class SendBatch:
+    """Preallocated sendmmsg() vector of up to max_msgs packets of pkt_size bytes to one address."""
+
+    def __init__(self, max_msgs: int, pkt_size: int, addr: tuple):
+        self.max_msgs = max_msgs
+        self.pkt_size = pkt_size
+        self._bufs = (ctypes.c_char * (max_msgs * pkt_size))()
+        self._mv = memoryview(self._bufs).cast("B")
+        self._iovs = (_IoVec * max_msgs)()
+        self._msgs = (_MMsgHdr * max_msgs)()
+        self._addr = _SockAddrIn()
+        self._addr.sin_family = socket.AF_INET
+        self._addr.sin_port = socket.htons(addr[1])
+        self._addr.sin_addr[:] = socket.inet_aton(socket.gethostbyname(addr[0]))
+        self.count = 0
+        base = ctypes.addressof(self._bufs)
+        for i in range(max_msgs):
+            self._iovs[i].iov_base = base + i * pkt_size
+            self._iovs[i].iov_len = pkt_size
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addr)
+            hdr.msg_namelen = ctypes.sizeof(self._addr)
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+
+    def add(self, pkt) -> bool:
+        """Copy pkt into the next slot; returns True when the batch is full."""
+        off = self.count * self.pkt_size
+        self._mv[off:off + self.pkt_size] = pkt
+        self.count += 1
+        return self.count >= self.max_msgs
+
+    def send(self, sock: socket.socket) -> int:
+        """Send every queued packet in one sendmmsg() call (retrying on partial sends).
+
+        Returns how many were sent; if the kernel accepts none, the rest of the batch is dropped.
+        """
+        sent = 0
+        while sent < self.count:
+            n = _sendmmsg(sock.fileno(), ctypes.byref(self._msgs, sent * ctypes.sizeof(_MMsgHdr)), self.count - sent, 0)
+            if n < 0:
+                self.count = 0
+                _raise_errno()
+            if n == 0:
+                break  # no progress: drop the rest rather than spin
+            sent += n
+        self.count = 0
+        return sent
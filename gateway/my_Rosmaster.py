@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # coding: utf-8
+from operator import attrgetter
 from Rosmaster_Lib import Rosmaster
 from protocol import *
 import time
@@ -22,15 +23,38 @@ def initialize_rosmaster(com_port: str, debug: bool=False) -> Rosmaster:
     bot.set_auto_report_state(True, forever=True)
     return bot
 
+# The driver's auto-report fields (name-mangled privates), read in one attrgetter call
+# and in STATE packet order, so Rosmaster_Lib.py can stay identical to the vendor copy
+_get_state_fields = attrgetter(
+    "_Rosmaster__ax", "_Rosmaster__ay", "_Rosmaster__az",
+    "_Rosmaster__gx", "_Rosmaster__gy", "_Rosmaster__gz",
+    "_Rosmaster__mx", "_Rosmaster__my", "_Rosmaster__mz",
+    "_Rosmaster__roll", "_Rosmaster__pitch", "_Rosmaster__yaw",
+    "_Rosmaster__encoder_m1", "_Rosmaster__encoder_m2", "_Rosmaster__encoder_m3", "_Rosmaster__encoder_m4")
+_RAD_TO_DEG = 57.2957795  # same factor as Rosmaster.get_imu_attitude_data(ToAngle=True)
+
+def get_state_snapshot(bot: Rosmaster) -> tuple:
+    # a_x, a_y, a_z, g_x, g_y, g_z, m_x, m_y, m_z, roll, pitch, yaw (deg), m1, m2, m3, m4
+    v = _get_state_fields(bot)
+    return v[:9] + (v[9] * _RAD_TO_DEG, v[10] * _RAD_TO_DEG, v[11] * _RAD_TO_DEG) + v[12:]
+
 def read_state(bot:Rosmaster):
     # --- Read latest sensor values (updated by receive thread) ---
     state = States()
-    state.imu.acc.x, state.imu.acc.y, state.imu.acc.z = bot.get_accelerometer_data()
-    state.imu.gyro.x, state.imu.gyro.y, state.imu.gyro.z = bot.get_gyroscope_data()
-    state.imu.mag.x, state.imu.mag.y, state.imu.mag.z = bot.get_magnetometer_data()
-    state.ang.roll, state.ang.pitch, state.ang.yaw = bot.get_imu_attitude_data(ToAngle=True)
-    state.enc.e1, state.enc.e2, state.enc.e3, state.enc.e4 = bot.get_motor_encoder()
+    acc, gyro, mag, ang, enc = state.imu.acc, state.imu.gyro, state.imu.mag, state.ang, state.enc
+    (acc.x, acc.y, acc.z,
+     gyro.x, gyro.y, gyro.z,
+     mag.x, mag.y, mag.z,
+     ang.roll, ang.pitch, ang.yaw,
+     enc.e1, enc.e2, enc.e3, enc.e4) = get_state_snapshot(bot)
     return state
+
+_pack_state_into = STATE_STRUCT.pack_into
+
+def read_state_pkt_into(bot: Rosmaster, buf: bytearray, seq: int, now_mono: float) -> None:
+    # Same fields as read_state() + prepare_state_pkt_into(), packed straight from the
+    # driver snapshot without building a States object (battery is not read, as in read_state)
+    _pack_state_into(buf, 0, seq, now_mono, *get_state_snapshot(bot), 0.0)
     
 def apply_actions(bot: Rosmaster, actions: Actions):
     # "4 PWMs" assumed as 4 motor commands.
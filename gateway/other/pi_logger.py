@@ -16,13 +16,16 @@ import time
 import struct
 from datetime import datetime
 from typing import Optional
+import logger as log
 from Rosmaster_Lib import Rosmaster
+from timerfd import PeriodicTimer
 from udp import UDPSockets
 from state_logger import StatesLogger
 from config_loader import *
 from protocol import *
 
 def main():
+    perf_counter = time.perf_counter
     cfg = load_config()
     rate_hz = float(cfg.get("timing", "rate_hz", fallback=DEFAULT_RATE))
     dt = 1.0 / rate_hz
@@ -44,32 +47,22 @@ def main():
     # Give it a moment to start filling data
     starting_beep(bot)
     actions = Actions()
-    start_mono = time.perf_counter()
-    next_tick = start_mono
+    start_mono = perf_counter()
+    # Kernel-paced ticks (timerfd): one blocking read per tick, no drift correction needed
+    timer = PeriodicTimer(dt)
     n = 0
     last_cmd_seq = None
     state_seq = 0
     with StatesLogger(log_dir, prefix) as dlogger:
         try:
             while True:
-                now_mono = time.perf_counter()
-                if now_mono < next_tick:
-                    # While waiting, still accept commands (no busy loop)
-                    timeout = max(0.0, next_tick - now_mono)
-                    pkt = udp.rx.try_recv_pkt(timeout, CMD_STRUCT.size)
-                    if pkt is not None:
-                        actions = parse_cmd_pkt(pkt)
-                        print(f"[INFO] Received CMD seq={actions.seq} m1={actions.motors.m1} m2={actions.motors.m2} m3={actions.motors.m3} m4={actions.motors.m4} beep_ms={actions.beep_ms}")
-                    continue
-
-                # Schedule next tick (prevents drift)
-                next_tick += dt
-                
-                # Non-blocking command poll (in case packets arrive exactly at tick time)
-                pkt = udp.rx.recv_pkt_non_blocking(CMD_STRUCT.size)
-                if pkt is not None:
-                    actions = parse_cmd_pkt(pkt)
-                    print(f"[INFO] Received CMD seq={actions.seq} m1={actions.motors.m1} m2={actions.motors.m2} m3={actions.motors.m3} m4={actions.motors.m4} beep_ms={actions.beep_ms}")
+                # Wait once per tick; commands that arrive meanwhile stay queued on the socket
+                timer.wait()
+                now_mono = perf_counter()
+
+                # Drain queued commands, keeping only the freshest one
+                for pkt in udp.rx.drain_pkts(CMD_STRUCT.size):
+                    parse_cmd_pkt_into(actions, pkt)
                 
                 # --- Read latest sensor values (updated by receive thread) ---
                 state = read_state(bot)
@@ -78,7 +71,9 @@ def main():
                 if actions.seq != last_cmd_seq and actions.seq >= 0:
                     last_cmd_seq = actions.seq
                     apply_actions(bot, actions)
-                    print(f"[INFO] Received CMD seq={actions.seq} m1={actions.motors.m1} m2={actions.motors.m2} m3={actions.motors.m3} m4={actions.motors.m4} beep_ms={actions.beep_ms}")
+                    if log.debug_enabled():
+                        log.debug("Received CMD seq=%d m1=%d m2=%d m3=%d m4=%d beep_ms=%d", actions.seq, actions.motors.m1,
+                                  actions.motors.m2, actions.motors.m3, actions.motors.m4, actions.beep_ms)
 
                 
                 # --- Log state to CSV ---
@@ -87,22 +82,23 @@ def main():
                 # --- Send STATE packet over UDP ---
                 state_seq += 1
                 state.seq = state_seq 
-                pkt = prepare_state_pkt(state, now_mono)
-                udp.tx.send_pkt(pkt)
+                prepare_state_pkt_into(udp.tx.state_buf, state, now_mono)
+                udp.tx.send_pkt(udp.tx.state_mv)
 
                 n += 1
+                elapsed = now_mono - start_mono
                 if n % int(rate_hz) == 0:
-                    elapsed = time.perf_counter() - start_mono
                     print(f"[INFO] {n} samples logged | elapsed={elapsed:.1f}s")
 
                 # Stop condition
-                if duration > 0 and (time.perf_counter() - start_mono) >= duration:
+                if duration > 0 and elapsed >= duration:
                     break
 
         except KeyboardInterrupt:
             print("\n[INFO] Stopped by user (Ctrl+C).")
 
         finally:
+            timer.close()
             # Safety stop motors on exit
             try:
                 bot.set_motor(0, 0, 0, 0)
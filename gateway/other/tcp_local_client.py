@@ -6,17 +6,20 @@ import threading
 import time
 
 from config_options import load_config_options
-from protocol import STATE_STRUCT, parse_state_pkt
-from tcp import recv_exact
+from protocol import STATE_STRUCT, States, parse_state_pkt_into
+from tcp import recv_exact_into, set_buffers, set_low_latency, set_rcvlowat
 
 
 def rx_loop(sock: socket.socket, print_hz: float, stop: threading.Event) -> None:
     last_print = 0.0
     min_dt = 1.0 / print_hz if print_hz > 0 else 0.0
+    # One STATE buffer and view, reused for every frame
+    mv = memoryview(bytearray(STATE_STRUCT.size))
+    state = States()
     try:
         while not stop.is_set():
-            pkt = recv_exact(sock, STATE_STRUCT.size)
-            t_mono, state = parse_state_pkt(pkt)
+            recv_exact_into(sock, mv, STATE_STRUCT.size)
+            t_mono = parse_state_pkt_into(state, mv)
             if min_dt <= 0.0:
                 continue
             now = time.time()
@@ -42,12 +45,15 @@ def main() -> None:
     while True:
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            set_low_latency(sock)
+            stream_bytes = int(STATE_STRUCT.size * cfg.timing.state_hz)
+            set_buffers(sock, rcv_bytes=stream_bytes, snd_bytes=stream_bytes)
+            set_rcvlowat(sock, STATE_STRUCT.size)
             sock.connect((host, port))
             stop = threading.Event()
             t = threading.Thread(target=rx_loop, args=(sock, args.print_hz, stop), daemon=True)
             t.start()
-            while not stop.is_set():
-                time.sleep(0.5)
+            stop.wait()  # blocks until the RX thread reports a disconnect
         except KeyboardInterrupt:
             break
         except Exception:
@@ -1,20 +1,21 @@
 # pi_server.py
-import queue
+import selectors
 import socket
 import threading
 import time
-from typing import Tuple
 
 from config_options import load_config_options
+from cpu_affinity import UNPINNED, pin_current_thread
 import logger as log
-from my_Rosmaster import Rosmaster, apply_actions, initialize_rosmaster, read_state
-from protocol import Actions, CMD_STRUCT, parse_cmd_pkt, prepare_state_pkt, print_actions, print_states
-from queue_recorder import QueueRecorder
-from tcp import TcpServer, recv_exact, set_buffers, set_low_latency
+from my_Rosmaster import Rosmaster, apply_actions, initialize_rosmaster, read_state_pkt_into
+from protocol import Actions, CMD_STRUCT, STATE_STRUCT, States, parse_cmd_pkt_into, parse_state_pkt_into, print_actions, print_states
+from shm_recorder import ShmRecorder, ShmRing
+from tcp import TcpServer, recv_exact_into, set_buffers, set_busy_poll, set_low_latency, set_quickack, set_rcvlowat
 
 PRINT_INTERVAL_S = 1.0
-RECORDER_QUEUE_MAX = 5000
-IDLE_SLEEP_S = 0.2
+RECORDER_RING_SLOTS = 8192  # power of two
+PRECISE_SLEEP_SLACK_S = 3e-4  # spin for the last part of the wait instead of trusting sleep()
+PRECISE_SLEEP_MIN_HZ = 200.0  # below this rate plain sleep() jitter is acceptable; don't burn a core
 
 def _configure_logging(cfg) -> None:
     log.set_file_logging_enabled(cfg.logging.enable)
@@ -23,99 +24,156 @@ def _configure_logging(cfg) -> None:
     log.set_print_level(cfg.logging.print_level)
     log.set_log_level(cfg.logging.log_level)
 
-def _maybe_print(last_printed: float, now: float, fn) -> float:
-    if now - last_printed >= PRINT_INTERVAL_S:
-        fn()
-        return now
-    return last_printed
-
-def _state_publisher_loop(
-    server: TcpServer,
-    bot: Rosmaster,
-    state_hz: float,
-    cmd_timeout_s: float,
-    recorder_dir: str,
-    recorder_prefix: str,
-) -> None:
-    log.info("States publisher listening")
-    conn, addr = server.accept()
-    log.info(f"States client connected: {addr}")
-
-    set_low_latency(conn)
-    set_buffers(conn)
-
-    last_cmd_time = time.time()
-    last_cmd = Actions()
-    state_seq = 0
-    stop_event = threading.Event()
-
-    state_q = queue.Queue(maxsize=RECORDER_QUEUE_MAX)
-    cmd_q = queue.Queue(maxsize=RECORDER_QUEUE_MAX)
-
-    def tx_state_loop() -> None:
-        nonlocal last_cmd_time, last_cmd, state_seq
-        dt = 1.0 / state_hz
-        next_time = time.perf_counter()
-        last_printed = 0.0
+def _precise_sleep_until(deadline: float, slack_s: float = PRECISE_SLEEP_SLACK_S) -> None:
+    # Coarse sleep() up to slack_s before the deadline, then spin on perf_counter()
+    remaining = deadline - time.perf_counter()
+    if remaining > slack_s:
+        time.sleep(remaining - slack_s)
+    while time.perf_counter() < deadline:
+        pass
+
+def _print_due(last_printed: float, now: float) -> bool:
+    # Callers print inline when due, so no closure is built on the ticks that don't print
+    return now - last_printed >= PRINT_INTERVAL_S
+
+class ClientWorker:
+    """
+    Persistent single-thread event loop serving one client pair at a time. CMD frames
+    are read when the selector reports the CMD socket readable, and STATE ticks run
+    when it times out at the next deadline, so RX and TX never trade the GIL between
+    threads. Re-pointed at each new client pair by attach(); between clients it blocks
+    on the connected event. The recorder rings are shared by every session.
+    """
+
+    def __init__(self, bot: Rosmaster, state_hz: float, cmd_timeout_s: float, state_ring: ShmRing, cmd_ring: ShmRing,
+                 core: int = UNPINNED, nice: int = 0, fifo_prio: int = 0):
+        self.bot = bot
+        self.state_hz = state_hz
+        self.cmd_timeout_s = cmd_timeout_s
+        self.state_ring = state_ring
+        self.cmd_ring = cmd_ring
+        self.core = core
+        self.nice = nice
+        self.fifo_prio = fifo_prio
+        self.state_conn = None
+        self.cmd_conn = None
+        self.connected = threading.Event()
+        self.disconnected = threading.Event()
+        self.stopping = threading.Event()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def attach(self, state_conn: socket.socket, cmd_conn: socket.socket) -> None:
+        """Point the worker at a new client pair and wake it."""
+        self.state_conn = state_conn
+        self.cmd_conn = cmd_conn
+        self.disconnected.clear()
+        self.connected.set()
+
+    def stop(self) -> None:
+        """Make the worker exit, unblocking it whether it is parked or serving a client."""
+        self.stopping.set()
+        self.connected.set()  # wakes a worker parked between clients
+        for conn in (self.state_conn, self.cmd_conn):
+            if conn is not None:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)  # ends a blocked recv/sendall
+                except OSError:
+                    pass
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _worker(self) -> None:
+        pin_current_thread("worker", self.core, self.nice, self.fifo_prio)
+        # stop() sets stopping before connected, so re-checking stopping after every
+        # wait/clear cannot miss it
+        while not self.stopping.is_set():
+            self.connected.wait()
+            if self.stopping.is_set():
+                break
+            self.serve()
+            self.connected.clear()
+            self.disconnected.set()
+
+    def serve(self) -> None:
+        bot, state_conn, cmd_conn = self.bot, self.state_conn, self.cmd_conn
+        state_ring, cmd_ring = self.state_ring, self.cmd_ring
+        dt = 1.0 / self.state_hz
+        # Persistent STATE send buffer, refilled from a fresh board read every tick
+        tx_buf = bytearray(STATE_STRUCT.size)
+        state = States()  # decoded from tx_buf for the rate-limited print
+        # CMD buffer and Actions, reused for every packet
+        pkt = bytearray(CMD_STRUCT.size)
+        pkt_mv = memoryview(pkt)
+        cmd = Actions()
+        precise = self.state_hz > PRECISE_SLEEP_MIN_HZ
+        state_seq = 0
+        missed_ticks = 0
+        last_state_printed = last_cmd_printed = 0.0
+        next_time = last_cmd_time = time.perf_counter()
+
+        sel = selectors.DefaultSelector()
+        sel.register(cmd_conn, selectors.EVENT_READ)
         try:
-            while not stop_event.is_set():
+            while self.connected.is_set() and not self.stopping.is_set():
                 now = time.perf_counter()
-                if now < next_time:
-                    time.sleep(next_time - now)
+                if now >= next_time:
+                    # One fresh packet per wake-up: ticks overrun by CMD handling or a late
+                    # wait are skipped and counted, never sent as duplicate samples
+                    n_due = int((now - next_time) / dt) + 1
+                    next_time += n_due * dt
+                    missed_ticks += n_due - 1
+
+                    if self.cmd_timeout_s > 0:
+                        age = now - last_cmd_time
+                        if age > self.cmd_timeout_s:
+                            log.warn("No CMD received for %.2f s, stopping motors" % age)
+                            apply_actions(bot, Actions())
+
+                    # The scheduling read doubles as the packet and recorder timestamp
+                    state_seq += 1
+                    read_state_pkt_into(bot, tx_buf, state_seq, now)
+                    state_conn.sendall(tx_buf)
+                    state_ring.push(tx_buf, now)
+
+                    if _print_due(last_state_printed, now):
+                        last_state_printed = now
+                        if missed_ticks:
+                            log.warn(f"STATE TX skipped {missed_ticks} late ticks")
+                            missed_ticks = 0
+                        # Print the sample just sent, not a second (later) board read
+                        parse_state_pkt_into(state, tx_buf)
+                        print_states(state)
                     continue
-                next_time += dt
-
-                if cmd_timeout_s > 0:
-                    age = time.time() - last_cmd_time
-                    if age > cmd_timeout_s:
-                        log.warn("No CMD received for %.2f s, stopping motors" % age)
-                        apply_actions(bot, Actions())
-
-                state = read_state(bot)
-                state_seq += 1
-                state.seq = state_seq
-                t_mono = time.perf_counter()
-                pkt = prepare_state_pkt(state, t_mono)
-                conn.sendall(pkt)
-
-                t_wall = time.time()
-                try:
-                    state_q.put_nowait((t_wall, t_mono, state))
-                except queue.Full:
-                    pass
 
-                last_printed = _maybe_print(last_printed, now, lambda: print_states(state))
-        except Exception as exc:
-            log.error(f"STATE TX stopped: {exc}")
-            stop_event.set()
+                # Block until a CMD frame is queued (SO_RCVLOWAT) or the next STATE tick
+                timeout = next_time - now
+                if precise:
+                    timeout -= PRECISE_SLEEP_SLACK_S
+                if not sel.select(max(timeout, 0.0)):
+                    if precise:
+                        _precise_sleep_until(next_time)
+                    continue
 
-    def rx_cmd_loop(cmd_conn: socket.socket) -> None:
-        nonlocal last_cmd_time, last_cmd
-        last_printed = 0.0
-        try:
-            while not stop_event.is_set():
-                pkt = recv_exact(cmd_conn, CMD_STRUCT.size)
-                cmd = parse_cmd_pkt(pkt)
-                last_cmd_time = time.time()
-                last_cmd = cmd
+                recv_exact_into(cmd_conn, pkt_mv, CMD_STRUCT.size)
+                set_quickack(cmd_conn)  # ACK this CMD now, not after the delayed-ACK timer
+                parse_cmd_pkt_into(cmd, pkt_mv)
+                now = time.perf_counter()
+                last_cmd_time = now
                 apply_actions(bot, cmd)
+                cmd_ring.push(pkt, now)
 
-                t_wall = time.time()
-                t_mono = time.perf_counter()
-                try:
-                    cmd_q.put_nowait((t_wall, t_mono, cmd))
-                except queue.Full:
-                    pass
-
-                last_printed = _maybe_print(last_printed, t_mono, lambda: print_actions(cmd))
+                if _print_due(last_cmd_printed, now):
+                    last_cmd_printed = now
+                    print_actions(cmd)
         except Exception as exc:
-            log.error(f"CMD RX stopped: {exc}")
-            stop_event.set()
-
-    recorder = QueueRecorder(recorder_dir, state_q, cmd_q, prefix=recorder_prefix)
-    recorder.start()
-
-    return conn, stop_event, tx_state_loop, rx_cmd_loop, recorder
+            if not self.stopping.is_set():  # stop() shuts the sockets down on purpose
+                log.error(f"Client session stopped: {exc}")
+        finally:
+            sel.close()
 
 def main() -> None:
     cfg = load_config_options()
@@ -131,26 +189,36 @@ def main() -> None:
     log.info(f"States TX on {local_ip}:{cfg.tcp.state_port} (local only)")
     log.info(f"CMD RX on {local_ip}:{cfg.tcp.cmd_port} (local only)")
 
+    # Created once and reused by every client: raw packets go to the recorder
+    # process through lock-free shared-memory rings
+    state_ring = ShmRing(RECORDER_RING_SLOTS, STATE_STRUCT.size)
+    cmd_ring = ShmRing(RECORDER_RING_SLOTS, CMD_STRUCT.size)
+    recorder = ShmRecorder(cfg.recorder.recorder_dir, state_ring, cmd_ring, prefix=cfg.recorder.recorder_prefix,
+                           core=cfg.threading.recorder_core)
+    recorder.start()
+    # One thread serves both STATE TX and CMD RX: it takes the TX core and priority
+    worker = ClientWorker(bot, cfg.timing.state_hz, cfg.timing.cmd_timeout_s, state_ring, cmd_ring,
+                          core=cfg.threading.tx_core, nice=cfg.threading.tx_nice,
+                          fifo_prio=cfg.threading.tx_fifo_prio)
+    worker.start()
+    pin_current_thread("main", cfg.threading.main_core)
+
     try:
         while True:
-            state_conn, stop_event, tx_state_loop, rx_cmd_loop, recorder = _state_publisher_loop(
-                state_server,
-                bot,
-                cfg.timing.state_hz,
-                cfg.timing.cmd_timeout_s,
-                cfg.recorder.recorder_dir,
-                cfg.recorder.recorder_prefix,
-            )
+            log.info("States publisher listening")
+            state_conn, addr = state_server.accept()
+            log.info(f"States client connected: {addr}")
+            set_low_latency(state_conn)
+            set_buffers(state_conn)
             cmd_conn, cmd_addr = cmd_server.accept()
             log.info(f"CMD client connected: {cmd_addr}")
+            set_low_latency(cmd_conn)
+            set_busy_poll(cmd_conn)
+            set_rcvlowat(cmd_conn, CMD_STRUCT.size)  # readable only once a whole CMD frame is queued
+            set_quickack(cmd_conn)
 
-            t_tx = threading.Thread(target=tx_state_loop, daemon=True)
-            t_rx = threading.Thread(target=rx_cmd_loop, args=(cmd_conn,), daemon=True)
-            t_tx.start()
-            t_rx.start()
-
-            while not stop_event.is_set():
-                time.sleep(IDLE_SLEEP_S)
+            worker.attach(state_conn, cmd_conn)
+            worker.disconnected.wait()
 
             try:
                 state_conn.close()
@@ -160,12 +228,21 @@ def main() -> None:
                 cmd_conn.close()
             except Exception:
                 pass
-            recorder.stop()
-            recorder.join()
             log.info("Waiting for next client...")
     except KeyboardInterrupt:
         log.info("Shutting down")
     finally:
+        # Worker first: it pushes into the rings and drives the motors
+        worker.stop()
+        worker.join()
+        try:
+            apply_actions(bot, Actions())
+        except Exception as exc:
+            log.warn(f"Stopping motors failed: {exc}")
+        recorder.stop()
+        recorder.join()
+        state_ring.close()
+        cmd_ring.close()
         log.close_logger()
 
 if __name__ == "__main__":
@@ -10,16 +10,19 @@ from config_loader import (
     DEFAULT_TCP_PORT,
     load_config,
 )
-from protocol import Actions, STATE_STRUCT, parse_state_pkt, prepare_cmd_pkt
-from other.tcp import recv_exact
+from protocol import CMD_STRUCT, STATE_STRUCT, States, parse_state_pkt_into
+from other.tcp import recv_exact_into, set_low_latency, set_rcvlowat
 
 def rx_loop(sock: socket.socket, print_hz: float, stop: threading.Event) -> None:
     last_print = 0.0
     min_dt = 1.0 / print_hz if print_hz > 0 else 0.0
+    # One STATE buffer and view, reused for every frame
+    mv = memoryview(bytearray(STATE_STRUCT.size))
+    state = States()
     try:
         while not stop.is_set():
-            pkt = recv_exact(sock, STATE_STRUCT.size)
-            t_mono, state = parse_state_pkt(pkt)
+            recv_exact_into(sock, mv, STATE_STRUCT.size)
+            t_mono = parse_state_pkt_into(state, mv)
             if min_dt <= 0.0:
                 continue
             now = time.time()
@@ -41,32 +44,35 @@ def tx_loop(
     motor_limit: int,
     beep_period: int,
     stop: threading.Event,
+    batch: int = 1,
 ) -> None:
     dt = 1.0 / rate_hz if rate_hz > 0 else 0.1
+    batch = max(1, batch)
     seq = 0
     m_val = 0
     direction = 1
+    # The ramp fields are packed straight into one reused buffer of `batch` CMD frames:
+    # no Actions object per tick and one sendall() per batch
+    size = CMD_STRUCT.size
+    pkts = bytearray(batch * size)
+    pkts_mv = memoryview(pkts)
+    pack_into = CMD_STRUCT.pack_into
     try:
         while not stop.is_set():
-            seq += 1
+            for i in range(batch):
+                seq += 1
 
-            m_val += direction * motor_step
-            if m_val >= motor_limit:
-                direction = -1
-            elif m_val <= -motor_limit:
-                direction = 1
+                m_val += direction * motor_step
+                if m_val >= motor_limit:
+                    direction = -1
+                elif m_val <= -motor_limit:
+                    direction = 1
 
-            actions = Actions()
-            actions.seq = seq
-            actions.motors.m1 = m_val
-            actions.motors.m2 = -m_val
-            actions.motors.m3 = 0
-            actions.motors.m4 = 0
-            if beep_period > 0 and seq % beep_period == 0:
-                actions.beep_ms = 80
-
-            sock.sendall(prepare_cmd_pkt(actions))
-            time.sleep(dt)
+                beep_ms = 80 if beep_period > 0 and seq % beep_period == 0 else 0
+                # seq, m1..m4, beep_ms, flags
+                pack_into(pkts, i * size, seq, m_val, -m_val, 0, 0, beep_ms, 0)
+            sock.sendall(pkts_mv)
+            time.sleep(batch * dt)
     except OSError:
         stop.set()
 
@@ -78,6 +84,7 @@ def main() -> None:
     parser.add_argument("--motor-step", type=int, default=None, help="Motor step per tick")
     parser.add_argument("--motor-limit", type=int, default=None, help="Motor absolute limit")
     parser.add_argument("--beep-period", type=int, default=None, help="Beep every N commands (0=off)")
+    parser.add_argument("--batch", type=int, default=1, help="CMD frames per sendall (stress test)")
     parser.add_argument("--print-hz", type=float, default=1.0, help="States print rate (Hz)")
     parser.add_argument("--no-tx", action="store_true", help="Disable command transmit")
     args = parser.parse_args()
@@ -108,6 +115,8 @@ def main() -> None:
 
     print(f"[TEST] Connecting to {host}:{port}")
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    set_low_latency(sock)
+    set_rcvlowat(sock, STATE_STRUCT.size)
     sock.connect((host, port))
     print("[TEST] Connected")
 
@@ -117,10 +126,9 @@ def main() -> None:
 
     try:
         if args.no_tx:
-            while not stop.is_set():
-                time.sleep(0.2)
+            stop.wait()  # blocks until the RX thread reports a disconnect
         else:
-            tx_loop(sock, cmd_rate_hz, motor_step, motor_limit, beep_period, stop)
+            tx_loop(sock, cmd_rate_hz, motor_step, motor_limit, beep_period, stop, args.batch)
     except KeyboardInterrupt:
         stop.set()
     finally:
@@ -16,31 +16,41 @@ from dataclasses import dataclass, field
 STATE_STRUCT = struct.Struct(">Ifffffffffffffiiiif")   # 76 bytes
 CMD_STRUCT   = struct.Struct(">IhhhhHB")               # 15 bytes
 
-@dataclass
+# Bound once so per-packet helpers skip the attribute lookup
+_pack_state = STATE_STRUCT.pack
+_pack_state_into = STATE_STRUCT.pack_into
+_unpack_state = STATE_STRUCT.unpack
+_unpack_state_from = STATE_STRUCT.unpack_from
+_pack_cmd = CMD_STRUCT.pack
+_pack_cmd_into = CMD_STRUCT.pack_into
+_unpack_cmd = CMD_STRUCT.unpack
+_unpack_cmd_from = CMD_STRUCT.unpack_from
+
+@dataclass(slots=True)
 class Point3d:
     x: float = 0.0
     y: float = 0.0
     z: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class Encoders:
-    e1: float = 0.0; e2: float = 0.0; e3: float = 0.0; e4: float = 0.0
+    e1: int = 0; e2: int = 0; e3: int = 0; e4: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class Motors:
     m1: int = 0; m2: int = 0; m3: int = 0; m4: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class Angles:
     roll: float = 0.0; pitch: float = 0.0; yaw: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class IMU:
     acc: Point3d = field(default_factory=Point3d)
     gyro: Point3d = field(default_factory=Point3d)
     mag: Point3d = field(default_factory=Point3d)
 
-@dataclass
+@dataclass(slots=True)
 class States:
     seq: int = 0
     imu: IMU = field(default_factory=IMU)
@@ -48,7 +58,7 @@ class States:
     enc: Encoders = field(default_factory=Encoders)
     battery: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class Actions:
     seq: int = 0
     motors: Motors = field(default_factory=Motors)
@@ -58,65 +68,72 @@ class Actions:
 
 def prepare_state_pkt(state: States, now_mono: float = 0.0) -> bytes:
     """Prepare STATE_STRUCT binary packet from dataclasss."""
-    pkt = STATE_STRUCT.pack(
-        int(state.seq),
+    pkt = _pack_state(
+        state.seq,
         now_mono,
-        float(state.imu.acc.x), float(state.imu.acc.y), float(state.imu.acc.z),
-        float(state.imu.gyro.x), float(state.imu.gyro.y), float(state.imu.gyro.z),
-        float(state.imu.mag.x), float(state.imu.mag.y), float(state.imu.mag.z),
-        float(state.ang.roll), float(state.ang.pitch), float(state.ang.yaw),
-        int(state.enc.e1), int(state.enc.e2), int(state.enc.e3), int(state.enc.e4), float(state.battery),
+        state.imu.acc.x, state.imu.acc.y, state.imu.acc.z,
+        state.imu.gyro.x, state.imu.gyro.y, state.imu.gyro.z,
+        state.imu.mag.x, state.imu.mag.y, state.imu.mag.z,
+        state.ang.roll, state.ang.pitch, state.ang.yaw,
+        state.enc.e1, state.enc.e2, state.enc.e3, state.enc.e4, state.battery,
     )
     return pkt
 
+def prepare_state_pkt_into(buf: bytearray, state: States, now_mono: float = 0.0) -> None:
+    """Pack STATE_STRUCT into a caller-owned buffer (no per-call allocation)."""
+    _pack_state_into(
+        buf, 0,
+        state.seq,
+        now_mono,
+        state.imu.acc.x, state.imu.acc.y, state.imu.acc.z,
+        state.imu.gyro.x, state.imu.gyro.y, state.imu.gyro.z,
+        state.imu.mag.x, state.imu.mag.y, state.imu.mag.z,
+        state.ang.roll, state.ang.pitch, state.ang.yaw,
+        state.enc.e1, state.enc.e2, state.enc.e3, state.enc.e4, state.battery,
+    )
+
 def prepare_cmd_pkt(actions: Actions) -> bytes:
     """Prepare CMD_STRUCT binary packet from Actions dataclass."""
-    pkt = CMD_STRUCT.pack(
+    pkt = _pack_cmd(
         int(actions.seq),
         int(actions.motors.m1), int(actions.motors.m2), int(actions.motors.m3), int(actions.motors.m4),
         actions.beep_ms, actions.flags,
     )
     return pkt
 
+def prepare_cmd_pkt_into(buf: bytearray, actions: Actions) -> None:
+    """Pack CMD_STRUCT into a caller-owned buffer (no per-call allocation)."""
+    m = actions.motors
+    _pack_cmd_into(buf, 0, actions.seq, m.m1, m.m2, m.m3, m.m4, actions.beep_ms, actions.flags)
+
 def parse_cmd_pkt(pkt: bytes) -> Actions:
     """Parse CMD_STRUCT binary state into Actions dataclass."""
-    unpacked = CMD_STRUCT.unpack(pkt)
-    actions = Actions()
-    actions.seq = int(unpacked[0])
-    actions.motors.m1 = int(unpacked[1])
-    actions.motors.m2 = int(unpacked[2])
-    actions.motors.m3 = int(unpacked[3])
-    actions.motors.m4 = int(unpacked[4])
-    actions.beep_ms = int(unpacked[5])
-    actions.flags = unpacked[6]
-    return actions
+    return parse_cmd_pkt_into(Actions(), pkt)
 
-def parse_state_pkt(pkt: bytes) -> States:
+def parse_state_pkt(pkt: bytes) -> tuple[float, States]:
     """Parse STATE_STRUCT binary state into States dataclass."""
-    unpacked = STATE_STRUCT.unpack(pkt)
     state = States()
-    state.seq = int(unpacked[0])
-    t_mono = float(unpacked[1])
-    state.imu.acc.x = float(unpacked[2])
-    state.imu.acc.y = float(unpacked[3])
-    state.imu.acc.z = float(unpacked[4])
-    state.imu.gyro.x = float(unpacked[5])
-    state.imu.gyro.y = float(unpacked[6])
-    state.imu.gyro.z = float(unpacked[7])
-    state.imu.mag.x = float(unpacked[8])
-    state.imu.mag.y = float(unpacked[9])
-    state.imu.mag.z = float(unpacked[10])
-    state.ang.roll = float(unpacked[11])
-    state.ang.pitch = float(unpacked[12])
-    state.ang.yaw = float(unpacked[13])
-    state.enc.e1 = int(unpacked[14])
-    state.enc.e2 = int(unpacked[15])
-    state.enc.e3 = int(unpacked[16])
-    state.enc.e4 = int(unpacked[17])
-    state.enc.e4 = int(unpacked[17])
-    state.battery = float(unpacked[18])
+    t_mono = parse_state_pkt_into(state, pkt)
     return t_mono, state
 
+def parse_cmd_pkt_into(actions: Actions, pkt: bytes) -> Actions:
+    """Parse CMD_STRUCT binary packet into an existing Actions instance (no allocation)."""
+    m = actions.motors
+    (actions.seq, m.m1, m.m2, m.m3, m.m4, actions.beep_ms, actions.flags) = _unpack_cmd_from(pkt)
+    return actions
+
+def parse_state_pkt_into(state: States, pkt: bytes) -> float:
+    """Parse STATE_STRUCT binary packet into an existing States instance; returns t_mono."""
+    imu, ang, enc = state.imu, state.ang, state.enc
+    (state.seq, t_mono,
+     imu.acc.x, imu.acc.y, imu.acc.z,
+     imu.gyro.x, imu.gyro.y, imu.gyro.z,
+     imu.mag.x, imu.mag.y, imu.mag.z,
+     ang.roll, ang.pitch, ang.yaw,
+     enc.e1, enc.e2, enc.e3, enc.e4,
+     state.battery) = _unpack_state_from(pkt)
+    return t_mono
+
 def print_states(state: States):
     print(f'seq={state.seq:8} '
           f'ax={state.imu.acc.x:+7.2f} ay={state.imu.acc.y:+7.2f} az={state.imu.acc.z:+7.2f} '
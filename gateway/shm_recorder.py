@@ -0,0 +1,242 @@
+# shm_recorder.py
+"""
+Packet recorder running in its own process.
+
+The tick/rx threads push raw STATE/CMD packets into single-producer/single-consumer
+rings of fixed-size slots in shared memory; a recorder process drains the rings
+and writes the CSV files, so disk I/O and row formatting never compete with the
+100 Hz loop for the GIL.
+
+The recorder is started with "spawn", not fork: by then the parent already runs
+the Rosmaster receive and logger threads, and a forked child could inherit a lock
+(stdout, the logger) held by one of them. The child attaches the shared memory by
+name and gets the counters and wakeup pipe passed at spawn time.
+
+While data flows the recorder drains every RECORDER_BATCH_S; once both rings are
+empty it arms them and blocks on a pipe, and the next push() writes one byte to
+wake it (only the empty->non-empty transition costs the producer a syscall).
+
+Slot layout: [t_wall d][t_mono d][packet bytes]
+"""
+import multiprocessing
+import os
+import select
+import signal
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+import logger as log
+from cpu_affinity import UNPINNED, pin_current_thread
+from csv_recorder import ACTIONS_ROW_FMT, STATES_ROW_FMT, ActionsHeader, CSVRecorder, StatesHeader, format_rows
+from protocol import CMD_STRUCT, STATE_STRUCT
+
+# The rings' counters and the recorder's event/pipe must come from the same context
+# as the recorder process so they can be passed to the spawned child
+_CTX = multiprocessing.get_context("spawn")
+
+SLOT_HEADER = struct.Struct("<dd")  # t_wall, t_mono at push time
+_U32 = 0xFFFFFFFF                   # head/tail are 32-bit so loads/stores are single words on the Pi
+
+RECORDER_BATCH_S = 0.05     # drain period while packets keep arriving
+RECORDER_IDLE_MAX_S = 1.0   # safety bound on an idle wait (covers a missed wakeup)
+DROP_REPORT_INTERVAL_S = 1.0
+
+
+class ShmRing:
+    """Bounded SPSC ring of fixed-size packet slots in shared memory. Drops new packets when full.
+
+    head/tail/armed are plain shared words, and nothing orders plain loads and stores
+    across processes (the GIL does not, and aarch64 may reorder them). So every access to
+    them goes through one shared lock, whose acquire/release are the memory barriers:
+    push() writes the slot and publishes head in one critical section, and pop_all()
+    reads head under the lock, copies the slots outside it, and publishes tail under it
+    again. That costs one uncontended lock per push and two per drain pass.
+    """
+
+    def __init__(self, slots: int, pkt_size: int):
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError(f"slots must be a power of two, got {slots}")
+        self.slots = slots
+        self.pkt_size = pkt_size
+        self.slot_size = SLOT_HEADER.size + pkt_size
+        self._mask = slots - 1
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_size)
+        self._lock = _CTX.Lock()  # orders the slot contents against head/tail (see class docstring)
+        self._head = _CTX.RawValue("I", 0)  # written by the producer only, under _lock
+        self._tail = _CTX.RawValue("I", 0)  # written by the consumer only, under _lock
+        self._armed = _CTX.RawValue("B", 0)  # set by an idle consumer that wants a wakeup, under _lock
+        self._dropped = _CTX.RawValue("I", 0)  # written by the producer only; the recorder reports it
+        self._wake_fd = -1
+        # t_wall is derived from one wall/monotonic pair taken here: one clock read per push,
+        # and the recorded t_wall never steps with NTP
+        self._wall_base = time.time()
+        self._mono_base = time.perf_counter()
+
+    def push(self, pkt, t_mono: Optional[float] = None) -> bool:
+        """Copy pkt into the next slot; pass t_mono to reuse a perf_counter() the caller already read."""
+        if t_mono is None:
+            t_mono = time.perf_counter()
+        with self._lock:
+            head = self._head.value
+            if (head - self._tail.value) & _U32 >= self.slots:
+                # Full: skip this packet (plain compare, no exception) and count it
+                self._dropped.value += 1
+                return False
+            off = (head & self._mask) * self.slot_size
+            buf = self._shm.buf
+            SLOT_HEADER.pack_into(buf, off, self._wall_base + (t_mono - self._mono_base), t_mono)
+            buf[off + SLOT_HEADER.size:off + self.slot_size] = pkt
+            self._head.value = (head + 1) & _U32
+            armed = self._armed.value
+            if armed:
+                self._armed.value = 0
+        if armed:
+            _wake(self._wake_fd)
+        return True
+
+    @property
+    def dropped(self) -> int:
+        """Packets skipped because the ring was full (shared, so the recorder can report it)."""
+        return self._dropped.value
+
+    def set_wake_fd(self, fd: int) -> None:
+        """Pipe write end that push() signals when the consumer is armed."""
+        self._wake_fd = fd
+
+    def arm(self) -> bool:
+        """Ask for a wakeup on the next push(); returns False (disarmed) if data is already pending."""
+        with self._lock:
+            if (self._head.value - self._tail.value) & _U32:
+                return False
+            self._armed.value = 1
+        return True
+
+    def pop_all(self, to_fields: Callable[[memoryview, int], tuple]) -> tuple[list, int]:
+        """Consume every pending slot; returns the flattened to_fields(buf, offset) values and the count."""
+        with self._lock:
+            tail = self._tail.value
+            count = (self._head.value - tail) & _U32
+        if not count:
+            return [], 0
+        # The producer never writes slots between tail and head, so they are read unlocked
+        buf = self._shm.buf
+        fields = []
+        for i in range(count):
+            fields.extend(to_fields(buf, ((tail + i) & self._mask) * self.slot_size))
+        with self._lock:
+            self._tail.value = (tail + count) & _U32
+        return fields, count
+
+    def close(self) -> None:
+        """Release the shared memory (creator side, after the recorder has exited)."""
+        if self._shm is None:
+            return
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+def _wake(fd: int) -> None:
+    try:
+        os.write(fd, b"\0")
+    except (BlockingIOError, OSError):
+        pass  # pipe already full or closed: the consumer is awake anyway
+
+
+def state_slot_fields(buf: memoryview, off: int) -> tuple:
+    # StatesHeader columns: t_wall, t_mono, ax..yaw, enc1..enc4 (seq, pkt t_mono and battery are not recorded)
+    return SLOT_HEADER.unpack_from(buf, off) + STATE_STRUCT.unpack_from(buf, off + SLOT_HEADER.size)[2:18]
+
+
+def cmd_slot_fields(buf: memoryview, off: int) -> tuple:
+    # ActionsHeader columns: t_wall, t_mono, m1..m4, beep_ms, flags
+    return SLOT_HEADER.unpack_from(buf, off) + CMD_STRUCT.unpack_from(buf, off + SLOT_HEADER.size)[1:]
+
+
+class ShmRecorder(_CTX.Process):
+    def __init__(self, recorderdir: str, state_ring: ShmRing, cmd_ring: ShmRing, prefix: str = "",
+                 core: int = UNPINNED):
+        super().__init__(daemon=True)
+        self.core = core
+        self.recorderdir = recorderdir
+        self.state_ring = state_ring
+        self.cmd_ring = cmd_ring
+        self.prefix = (prefix or "").strip()
+        self._stop_event = _CTX.Event()
+        # Connection objects (unlike bare fds) are handed to the spawned child
+        self._wake_r, self._wake_w = _CTX.Pipe(duplex=False)
+        os.set_blocking(self._wake_r.fileno(), False)
+        os.set_blocking(self._wake_w.fileno(), False)
+        state_ring.set_wake_fd(self._wake_w.fileno())
+        cmd_ring.set_wake_fd(self._wake_w.fileno())
+        # The spawned child starts with a fresh logger: give it the parent's settings
+        # (it writes its own "recorder" files, see run())
+        self._log_settings = log.get_settings()
+
+    def stop(self):
+        self._stop_event.set()
+        _wake(self._wake_w.fileno())
+
+    def run(self):
+        # The parent owns shutdown and tells us through stop()
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        log.apply_settings(self._log_settings)
+        # Own log files: rotation counts bytes per process, so two writers must not share a file
+        log.set_file_tag("recorder")
+        pin_current_thread("recorder", self.core)
+        try:
+            with CSVRecorder(recorderdir=self.recorderdir, prefix=self._prefixed("state"), header=StatesHeader) as state_recorder, \
+                 CSVRecorder(recorderdir=self.recorderdir, prefix=self._prefixed("cmd"), header=ActionsHeader) as cmd_recorder:
+                reported = {"state": 0, "cmd": 0}
+                next_report = time.monotonic() + DROP_REPORT_INTERVAL_S
+                while not self._stop_event.is_set():
+                    got_state = self._drain(state_recorder, self.state_ring, state_slot_fields, STATES_ROW_FMT)
+                    got_cmd = self._drain(cmd_recorder, self.cmd_ring, cmd_slot_fields, ACTIONS_ROW_FMT)
+                    if got_state or got_cmd:
+                        now = time.monotonic()
+                        if now >= next_report:
+                            next_report = now + DROP_REPORT_INTERVAL_S
+                            self._report_drops(reported)
+                        self._stop_event.wait(RECORDER_BATCH_S)  # let the next batch accumulate
+                    else:
+                        self._wait_for_data()
+                # Flush whatever was pushed before stop()
+                self._drain(state_recorder, self.state_ring, state_slot_fields, STATES_ROW_FMT)
+                self._drain(cmd_recorder, self.cmd_ring, cmd_slot_fields, ACTIONS_ROW_FMT)
+                self._report_drops(reported)
+        except Exception as exc:
+            log.error(f"Recorder stopped: {exc}")
+            self._stop_event.set()
+        finally:
+            log.close_logger()
+
+    def _report_drops(self, reported: dict) -> None:
+        for name, ring in (("state", self.state_ring), ("cmd", self.cmd_ring)):
+            dropped = ring.dropped
+            if dropped != reported[name]:
+                log.warn(f"{name} ring full: dropped {(dropped - reported[name]) & _U32} pkts ({dropped} total)")
+                reported[name] = dropped
+
+    def _wait_for_data(self) -> None:
+        # Both rings just came up empty: block until a producer pushes (or stop())
+        if self.state_ring.arm() and self.cmd_ring.arm():
+            select.select([self._wake_r], [], [], RECORDER_IDLE_MAX_S)
+        try:
+            os.read(self._wake_r.fileno(), 64)
+        except BlockingIOError:
+            pass
+
+    def _drain(self, recorder: CSVRecorder, ring: ShmRing, to_fields: Callable, row_fmt: str) -> bool:
+        fields, count = ring.pop_all(to_fields)
+        if not count:
+            return False
+        recorder.write_rows(format_rows(row_fmt, fields, count))
+        return True
+
+    def _prefixed(self, name: str) -> str:
+        if self.prefix:
+            return f"{self.prefix}_{name}"
+        return name
@@ -47,6 +47,29 @@ def set_low_latency(conn: socket.socket) -> None:
         pass
 
 
+# Not exported by the socket module; Linux values (asm-generic/socket.h, netinet/tcp.h)
+SO_BUSY_POLL = getattr(socket, "SO_BUSY_POLL", 46)
+TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", 12)
+BUSY_POLL_US = 50
+
+
+def set_busy_poll(conn: socket.socket, usec: int = BUSY_POLL_US) -> None:
+    # Spin on the NIC queue for up to usec in recv instead of sleeping until the softirq wakes us.
+    # Raising it above net.core.busy_read needs CAP_NET_ADMIN: ignore EPERM like the other options
+    try:
+        conn.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, usec)
+    except OSError:
+        pass
+
+
+def set_quickack(conn: socket.socket) -> None:
+    # One-shot on Linux (the stack drops back to delayed ACKs): re-arm after every recv
+    try:
+        conn.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+    except OSError:
+        pass
+
+
 def set_buffers(conn: socket.socket, rcv_bytes: int = 262144, snd_bytes: int = 262144) -> None:
     try:
         conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcv_bytes)
@@ -55,12 +78,34 @@ def set_buffers(conn: socket.socket, rcv_bytes: int = 262144, snd_bytes: int = 2
         pass
 
 
-def recv_exact(conn: socket.socket, n: int) -> bytes:
-    """Receive exactly n bytes or raise ConnectionError."""
-    data = b""
-    while len(data) < n:
-        chunk = conn.recv(n - len(data))
-        if not chunk:
+def set_rcvlowat(conn: socket.socket, n_bytes: int) -> None:
+    # Don't wake a blocking recv until a whole frame of n_bytes is queued
+    try:
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVLOWAT, n_bytes)
+    except (OSError, AttributeError):
+        pass
+
+
+# Ask the kernel to return only once the whole frame is in (one syscall in the common case)
+_WAITALL = getattr(socket, "MSG_WAITALL", 0)
+
+
+def recv_exact_into(conn: socket.socket, mv: memoryview, n: int) -> None:
+    """Fill mv[:n] from conn or raise ConnectionError. mv is the caller's persistent view: nothing is allocated."""
+    got = conn.recv_into(mv, n, _WAITALL)  # the whole frame in the common case: no slicing
+    if got == 0:
+        raise ConnectionError("Client disconnected")
+    # MSG_WAITALL can still come back short (signal, timeout): keep looping on the rest
+    while got < n:
+        r = conn.recv_into(mv[got:], n - got, _WAITALL)
+        if r == 0:
             raise ConnectionError("Client disconnected")
-        data += chunk
-    return data
+        got += r
+
+
+def recv_exact(conn: socket.socket, n: int, buf: Optional[bytearray] = None) -> bytearray:
+    """Receive exactly n bytes (into buf if given) or raise ConnectionError."""
+    if buf is None:
+        buf = bytearray(n)
+    recv_exact_into(conn, memoryview(buf), n)
+    return buf
@@ -6,17 +6,20 @@ import threading
 import time
 
 from config_options import load_config_options
-from protocol import Actions, STATE_STRUCT, parse_state_pkt, prepare_cmd_pkt, print_states
-from tcp import recv_exact
+from protocol import Actions, CMD_STRUCT, STATE_STRUCT, States, parse_state_pkt_into, prepare_cmd_pkt_into, print_states
+from tcp import recv_exact_into, set_buffers, set_low_latency, set_rcvlowat
 
 
 def rx_loop(sock: socket.socket, print_hz: float, stop: threading.Event) -> None:
     last_print = 0.0
     min_dt = 1.0 / print_hz if print_hz > 0 else 0.0
+    # One STATE buffer and view, reused for every frame
+    mv = memoryview(bytearray(STATE_STRUCT.size))
+    state = States()
     try:
         while not stop.is_set():
-            pkt = recv_exact(sock, STATE_STRUCT.size)
-            t_mono, state = parse_state_pkt(pkt)
+            recv_exact_into(sock, mv, STATE_STRUCT.size)
+            t_mono = parse_state_pkt_into(state, mv)
             if min_dt <= 0.0:
                 continue
             now = time.time()
@@ -31,12 +34,13 @@ def rx_loop(sock: socket.socket, print_hz: float, stop: threading.Event) -> None
 def tx_loop(sock: socket.socket, rate_hz: float, stop: threading.Event) -> None:
     dt = 1.0 / rate_hz if rate_hz > 0 else 0.1
     seq = 0
+    actions = Actions()
+    pkt = bytearray(CMD_STRUCT.size)
     try:
         while not stop.is_set():
             seq += 1
-            actions = Actions()
             actions.seq = seq
-            pkt = prepare_cmd_pkt(actions)
+            prepare_cmd_pkt_into(pkt, actions)
             # print(pkt)
             # print(len(pkt))
             sock.sendall(pkt)
@@ -59,6 +63,11 @@ def main() -> None:
 
     print(f"[PC] Connecting CMD to {host}:{cmd_port}")
     cmd_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # CMD frames go out immediately (no Nagle); buffers hold ~1 s of STATE frames
+    set_low_latency(cmd_sock)
+    stream_bytes = int(STATE_STRUCT.size * cfg.timing.state_hz)
+    set_buffers(cmd_sock, rcv_bytes=stream_bytes, snd_bytes=stream_bytes)
+    set_rcvlowat(cmd_sock, STATE_STRUCT.size)
     cmd_sock.connect((host, cmd_port))
     print("[PC] CMD connected")
 
@@ -68,8 +77,7 @@ def main() -> None:
 
     try:
         if args.no_tx:
-            while not stop.is_set():
-                time.sleep(0.2)
+            stop.wait()  # blocks until the RX thread reports a disconnect
         else:
             tx_loop(cmd_sock, args.cmd_rate_hz, stop)
     except KeyboardInterrupt:
@@ -0,0 +1,96 @@
+# timerfd.py
+"""
+Periodic tick source for the fixed-rate loops.
+
+On Linux a timerfd (ctypes; os.timerfd_* only exists from Python 3.13) is armed
+once on CLOCK_MONOTONIC with an absolute first deadline and a fixed interval, so
+each tick is a single blocking read() and the kernel keeps the schedule.
+Elsewhere it falls back to sleeping until the next perf_counter() deadline.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import time
+
+CLOCK_MONOTONIC = 1
+TFD_CLOEXEC = 0o2000000
+TFD_TIMER_ABSTIME = 1
+
+_EXPIRATIONS = struct.Struct("=Q")
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    _timerfd_create = _libc.timerfd_create
+    _timerfd_settime = _libc.timerfd_settime
+    HAVE_TIMERFD = hasattr(time, "CLOCK_MONOTONIC")
+except (OSError, AttributeError):
+    HAVE_TIMERFD = False
+
+
+class _TimeSpec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class _ITimerSpec(ctypes.Structure):
+    _fields_ = [("it_interval", _TimeSpec), ("it_value", _TimeSpec)]
+
+
+if HAVE_TIMERFD:
+    _timerfd_create.argtypes = [ctypes.c_int, ctypes.c_int]
+    _timerfd_create.restype = ctypes.c_int
+    _timerfd_settime.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(_ITimerSpec), ctypes.c_void_p]
+    _timerfd_settime.restype = ctypes.c_int
+
+
+def _set_timespec(ts: _TimeSpec, seconds: float) -> None:
+    ns = int(round(seconds * 1e9))
+    ts.tv_sec, ts.tv_nsec = divmod(ns, 1_000_000_000)
+
+
+def _raise_errno() -> None:
+    err = ctypes.get_errno()
+    raise OSError(err, errno.errorcode.get(err, "error"))
+
+
+class PeriodicTimer:
+    """Fires every period_s seconds; the first tick is immediate."""
+
+    def __init__(self, period_s: float):
+        self.period_s = period_s
+        self._fd = -1
+        self._next = time.perf_counter()
+        if HAVE_TIMERFD:
+            self._fd = _timerfd_create(CLOCK_MONOTONIC, TFD_CLOEXEC)
+            if self._fd < 0:
+                _raise_errno()
+            spec = _ITimerSpec()
+            _set_timespec(spec.it_interval, period_s)
+            # An absolute deadline of "now" is already expired: the first read() returns at once
+            _set_timespec(spec.it_value, time.clock_gettime(time.CLOCK_MONOTONIC))
+            if _timerfd_settime(self._fd, TFD_TIMER_ABSTIME, ctypes.byref(spec), None) < 0:
+                os.close(self._fd)
+                self._fd = -1
+                _raise_errno()
+
+    def wait(self) -> int:
+        """Block until the next tick; returns how many ticks elapsed (>1 means some were missed)."""
+        if self._fd >= 0:
+            return _EXPIRATIONS.unpack(os.read(self._fd, 8))[0]
+        now = time.perf_counter()
+        if now < self._next:
+            time.sleep(self._next - now)
+        self._next += self.period_s
+        return 1
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "PeriodicTimer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import select
 import socket
-from select import select
-from typing import Optional
+import time
+from typing import Iterator, List, Optional
+
+from mmsg import HAVE_MMSG, RecvBatch, SendBatch
+from protocol import STATE_STRUCT
+from tcp import set_buffers, set_busy_poll
+
+# Non-blocking from socket() itself where supported (Linux); Python sockets are already close-on-exec
+SOCK_NONBLOCK = getattr(socket, "SOCK_NONBLOCK", 0)
 
 class UDPSockets():
     def __init__(self, tx_ip: str, tx_port: int, rx_ip: str, rx_port: int):
@@ -19,17 +27,37 @@ class UDPSockets():
         self.close()
 
 class UDPTxSockets():
-    def __init__(self, ip: str, port: int):
+    def __init__(self, ip: str, port: int, max_batch: int = 1):
         # States TX
         self.tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.state_addr = (ip, port)
+        # Reusable STATE packet buffer, filled in place with prepare_state_pkt_into()
+        self.state_buf = bytearray(STATE_STRUCT.size)
+        self.state_mv = memoryview(self.state_buf)
+        # Optional sendmmsg() batching: up to max_batch STATE pkts per syscall. With one pkt
+        # per tick a pkt waits at most max_batch - 1 ticks; max_batch=1 sends every pkt immediately.
+        self._batch = None
+        if max_batch > 1 and HAVE_MMSG:
+            self._batch = SendBatch(max_batch, STATE_STRUCT.size, self.state_addr)
         print(f"[INFO] Transmit -> udp://{ip}:{port}")
     
-    def send_pkt(self, pkt: bytes):
+    def send_pkt(self, pkt: bytes | memoryview):
         # --- Send STATE packet over UDP ---
-        self.tx.sendto(pkt, self.state_addr)
+        batch = self._batch
+        if batch is None:
+            self.tx.sendto(pkt, self.state_addr)
+            return
+        if batch.add(pkt):
+            batch.send(self.tx)
+
+    def flush(self):
+        # Send any batched pkts now (tick boundary / shutdown)
+        if self._batch is not None and self._batch.count:
+            self._batch.send(self.tx)
         
     def close(self):
+        if self.tx.fileno() != -1:
+            self.flush()
         self.tx.close()
         
     def __del__(self):
@@ -38,30 +66,131 @@ class UDPTxSockets():
 class UDPRxSockets():
     def __init__(self, ip: str, port: int):
         # Command RX (non-blocking)
-        self.rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM | SOCK_NONBLOCK)
+        if not SOCK_NONBLOCK:
+            self.rx.setblocking(False)
         self.rx.bind((ip, port))
-        self.rx.setblocking(False)  
+        # Room for bursts while the RX thread is descheduled; kernel-side busy polling
+        # (SO_BUSY_POLL) for the recv after each wakeup. Both are best effort.
+        set_buffers(self.rx)
+        set_busy_poll(self.rx)
+        # Reusable receive buffer; larger than any packet so oversized datagrams are detected
+        self._rx_buf = bytearray(1024)
+        self._rx_mv = memoryview(self._rx_buf)
+        self._batch = None  # recvmmsg() vector, created on first recv_batch()
+        self._pool = []  # per-packet receive buffers for recv_batch() without recvmmsg()
+        # Persistent epoll interest list (Linux); plain select() elsewhere
+        self._epoll = None
+        self._rx_fd = self.rx.fileno()
+        self._wait_fds = [self.rx]
+        if hasattr(select, "epoll"):
+            self._epoll = select.epoll()
+            self._epoll.register(self._rx_fd, select.EPOLLIN)
     
         print(f"[INFO] Receive <- udp://{ip}:{port}")
     
-    def try_recv_pkt(self, timeout: float, pct_size: int)-> Optional[bytes]:
+    def try_recv_pkt(self, timeout: float, pct_size: int, busy_us: int = 0)-> Optional[memoryview]:
+        # Optionally spin on zero-timeout readiness polls for busy_us first, so back-to-back
+        # packets are picked up without sleeping in the kernel
+        if busy_us > 0:
+            deadline = time.perf_counter_ns() + busy_us * 1000
+            while time.perf_counter_ns() < deadline:
+                if self.wait_readable(0):
+                    return self._recv_ready(pct_size)
         # Non-blocking pkt poll (in case packets arrive exactly at tick time)
-        r, _, _ = select([self.rx], [], [], timeout)
-        if r:
-            return self.recv_pkt_non_blocking(pct_size)
+        if self.wait_readable(timeout):
+            return self._recv_ready(pct_size)
         return None
     
-    def recv_pkt_non_blocking(self, pct_size: int)-> Optional[bytes]:
+    def try_recv_batch(self, timeout: Optional[float], pct_size: int, busy_us: int = 0, max_msgs: int = 32) -> List[memoryview]:
+        # Like try_recv_pkt, but returns every queued pkt of pct_size (up to max_msgs),
+        # read with a single recvmmsg() where available.
+        if busy_us > 0:
+            deadline = time.perf_counter_ns() + busy_us * 1000
+            while time.perf_counter_ns() < deadline:
+                # Spin on the zero-timeout readiness check; one recvmmsg() once data is queued
+                if self.wait_readable(0):
+                    return self.recv_batch(pct_size, max_msgs)
+        if self.wait_readable(timeout):
+            return self.recv_batch(pct_size, max_msgs)
+        return []
+
+    def recv_batch(self, pct_size: int, max_msgs: int = 32) -> List[memoryview]:
+        # Views alias preallocated buffers: consume them before the next receive call.
+        if not HAVE_MMSG:
+            return self._recv_batch_pooled(pct_size, max_msgs)
+        if self._batch is None or self._batch.max_msgs != max_msgs:
+            self._batch = RecvBatch(max_msgs, len(self._rx_buf))
+        return self._batch.recv(self.rx, pct_size)
+
+    def _recv_batch_pooled(self, pct_size: int, max_msgs: int) -> List[memoryview]:
+        # One recvfrom_into() per datagram, each into its own preallocated buffer, so the
+        # returned views stay valid together without copying every pkt into a new bytes
+        pool = self._pool
+        while len(pool) < max_msgs:
+            pool.append(memoryview(bytearray(len(self._rx_buf))))
+        pkts = []
+        for i in range(max_msgs):
+            mv = pool[i]
+            try:
+                n, _ = self.rx.recvfrom_into(mv)
+            except BlockingIOError:
+                break
+            if n == pct_size:
+                pkts.append(mv[:n])
+        return pkts
+
+    def _recv_ready(self, pct_size: int) -> Optional[memoryview]:
+        # Only called once wait_readable() reported the socket ready: a datagram is queued,
+        # so no BlockingIOError handling on this path.
+        n, _ = self.rx.recvfrom_into(self._rx_mv)
+        if n == pct_size:
+            return self._rx_mv[:n]
+        return None
+
+    def recv_pkt_non_blocking(self, pct_size: int)-> Optional[memoryview]:
         # Non-blocking pkt poll (in case packets arrive exactly at tick time)
+        # The returned view aliases the receive buffer: consume it before the next call.
         try:
-            pct, _ = self.rx.recvfrom(1024)
-            if len(pct) == pct_size:
-                return pct
+            n, _ = self.rx.recvfrom_into(self._rx_mv)
+            if n == pct_size:
+                return self._rx_mv[:n]
         except BlockingIOError:
             pass
         return None
     
+    def add_wakeup_fd(self, sock: socket.socket) -> None:
+        # Extra fd (e.g. a shutdown socket) that also ends wait_readable()
+        self._wait_fds.append(sock)
+        if self._epoll is not None:
+            self._epoll.register(sock.fileno(), select.EPOLLIN)
+
+    def wait_readable(self, timeout: Optional[float]) -> bool:
+        # True when a pkt is queued on the RX socket. A readable wakeup fd ends the wait
+        # early with False. timeout=None blocks until one of them is readable.
+        if self._epoll is not None:
+            events = self._epoll.poll(-1 if timeout is None else timeout, len(self._wait_fds))
+            for fd, _ in events:
+                if fd == self._rx_fd:
+                    return True
+            return False
+        r, _, _ = select.select(self._wait_fds, [], [], timeout)
+        return self.rx in r
+
+    def drain_pkts(self, pct_size: int) -> Iterator[memoryview]:
+        # Yield every queued pkt of pct_size until the socket is empty.
+        # Each view aliases the receive buffer and is only valid until the next one is read.
+        while True:
+            try:
+                n, _ = self.rx.recvfrom_into(self._rx_mv)
+            except BlockingIOError:
+                return
+            if n == pct_size:
+                yield self._rx_mv[:n]
+
     def close(self):
+        if self._epoll is not None:
+            self._epoll.close()
         self.rx.close()
         
     def __del__(self):
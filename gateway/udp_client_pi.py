@@ -6,7 +6,7 @@ import time
 from pathlib import Path
 
 from config_options import load_config_options
-from protocol import STATE_STRUCT, parse_state_pkt
+from protocol import STATE_STRUCT, States, parse_state_pkt_into
 
 # Allow importing udp.py from ./other without making it a package
 _OTHER_DIR = Path(__file__).resolve().parent / "other"
@@ -18,11 +18,12 @@ from udp import UDPRxSockets  # noqa: E402
 def rx_loop(rx: UDPRxSockets, print_hz: float, stop: threading.Event) -> None:
     last_print = 0.0
     min_dt = 1.0 / print_hz if print_hz > 0 else 0.0
+    state = States()
     while not stop.is_set():
         pkt = rx.try_recv_pkt(timeout=0.1, pct_size=STATE_STRUCT.size)
         if not pkt:
             continue
-        t_mono, state = parse_state_pkt(pkt)
+        t_mono = parse_state_pkt_into(state, pkt)
         if min_dt <= 0.0:
             continue
         now = time.time()
@@ -52,8 +53,7 @@ def main() -> None:
     t.start()
 
     try:
-        while not stop.is_set():
-            time.sleep(0.2)
+        stop.wait()  # blocks until the RX thread reports a disconnect
     except KeyboardInterrupt:
         stop.set()
 
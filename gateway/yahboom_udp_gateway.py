@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 # udp_server_pi.py
+import select
+import socket
 import threading
 import time
 from dataclasses import dataclass
@@ -8,21 +10,38 @@ import signal
 
 import logger as log
 from config_options import load_config_options
-from my_Rosmaster import Rosmaster, apply_actions, initialize_rosmaster, read_state
-from protocol import Actions, CMD_STRUCT, States, parse_cmd_pkt, prepare_state_pkt, print_actions, print_states
-from queue_recorder import QueueRecorder, MyQueue
-from udp import UDPSockets, UDPRxSockets, UDPTxSockets
+from cpu_affinity import pin_current_thread
+from my_Rosmaster import Rosmaster, apply_actions, initialize_rosmaster, read_state_pkt_into
+from protocol import Actions, CMD_STRUCT, STATE_STRUCT, States, parse_cmd_pkt_into, parse_state_pkt_into, print_actions, print_states
+from shm_recorder import ShmRecorder, ShmRing
+from timerfd import PeriodicTimer
+from udp import SOCK_NONBLOCK, UDPSockets, UDPRxSockets, UDPTxSockets
 
 DEFAULT_PRINT_INTERVAL_S = 1.0
-DEFAULT_RECORDER_QUEUE_MAX = 5000
-DEFAULT_IDLE_SLEEP_S = 0.002
+DEFAULT_RECORDER_RING_SLOTS = 4096  # power of two
+DEFAULT_RX_BUSY_POLL_US = 100  # spin before blocking on the CMD socket
+DEFAULT_CMD_TIMEOUT_CHECK_S = 1.0  # tx_loop checks the CMD timeout once per this interval (counted in ticks)
 
 
-running = False
+# Shutdown wakeup: one byte written to _shutdown_w makes _shutdown_r readable for
+# good, waking every loop that waits on it (the byte is never drained, so every
+# loop must exit once it fires). _terminate is set first, so a loop woken by the
+# byte always sees it.
+_terminate = threading.Event()
+_shutdown_r, _shutdown_w = socket.socketpair()
+_shutdown_r.setblocking(False)
+_shutdown_w.setblocking(False)
+
+def _wake_all() -> None:
+    try:
+        _shutdown_w.send(b"x")
+    except (BlockingIOError, OSError):
+        pass  # already signalled
+
 def _stop(*args):
-    global running
     log.warn("Recived Stop SIGNAL!!")
-    running = False
+    _terminate.set()
+    _wake_all()
 
 signal.signal(signal.SIGINT, _stop)
 signal.signal(signal.SIGTERM, _stop)
@@ -36,12 +55,10 @@ def _configure_logging(cfg) -> None:
     log.set_log_level(cfg.logging.log_level)
 
 
-def _maybe_print(last_printed: float, fn, interval_s: float) -> float:
-    now = time.perf_counter()
-    if now - last_printed >= interval_s:
-        fn()
-        return now
-    return last_printed
+def _print_due(last_printed: float, now: float, interval_s: float) -> bool:
+    # now comes from the caller, which already read the clock for its own bookkeeping.
+    # Callers print inline when due, so no closure is built on the ticks that don't print.
+    return now - last_printed >= interval_s
 
 
 @dataclass
@@ -54,7 +71,12 @@ class UdpServerConfig:
     info_port: int
     recorder_dir: str
     recorder_prefix: str
-    idle_sleep_s: float
+    rx_core: int
+    tx_core: int
+    recorder_core: int
+    tx_nice: int
+    tx_fifo_prio: int
+    tx_max_batch: int
 
 
 def build_udp_server_config(cfg) -> UdpServerConfig:
@@ -67,20 +89,25 @@ def build_udp_server_config(cfg) -> UdpServerConfig:
         tx_hz=cfg.timing.state_hz,
         recorder_dir=cfg.recorder.recorder_dir,
         recorder_prefix=cfg.recorder.recorder_prefix,
-        idle_sleep_s=DEFAULT_IDLE_SLEEP_S,
+        rx_core=cfg.threading.rx_core,
+        tx_core=cfg.threading.tx_core,
+        recorder_core=cfg.threading.recorder_core,
+        tx_nice=cfg.threading.tx_nice,
+        tx_fifo_prio=cfg.threading.tx_fifo_prio,
+        tx_max_batch=cfg.udp.tx_max_batch,
     )
 
 
 
 class Server:
-    def __init__(self, handle_state: Callable[[], tuple[bytes, States]],
-    handle_cmd: Callable[[bytes], Actions],
+    def __init__(self, handle_state: Callable[[], tuple[bytearray, float]],
+    handle_cmd: Callable[[bytes, float], Actions],
     handle_timeout_if_needed: Callable[[], None],
     server_cfg: UdpServerConfig,
 ):
-        self.terminate_event = threading.Event()
+        # Shared with the signal handler, so SIGINT/SIGTERM stops every loop
+        self.terminate_event = _terminate
         self.tx_hz = server_cfg.tx_hz
-        self.idle_sleep_s = server_cfg.idle_sleep_s
         self.handle_state = handle_state
         self.handle_cmd = handle_cmd
         self.handle_timeout_if_needed = handle_timeout_if_needed
@@ -91,76 +118,101 @@ class Server:
         tx_ip = server_cfg.tx_ip
         tx_port = server_cfg.tx_port
         self.info_port = server_cfg.info_port
+        self.rx_core = server_cfg.rx_core
+        self.tx_core = server_cfg.tx_core
+        self.tx_nice = server_cfg.tx_nice
+        self.tx_fifo_prio = server_cfg.tx_fifo_prio
         self.udp_rx = UDPRxSockets(ip=rx_ip, port=rx_port)
-        self.udp_tx = UDPTxSockets(ip=tx_ip, port=tx_port)
+        self.udp_rx.add_wakeup_fd(_shutdown_r)
+        self.udp_tx = UDPTxSockets(ip=tx_ip, port=tx_port, max_batch=server_cfg.tx_max_batch)
         log.info(f"UDP RX bound to {rx_ip}:{rx_port}, TX to {tx_ip}:{tx_port} at {self.tx_hz:.2f} Hz")
 
-        self.tx_que = MyQueue(maxsize=DEFAULT_RECORDER_QUEUE_MAX)
-        self.rx_que = MyQueue(maxsize=DEFAULT_RECORDER_QUEUE_MAX)
-        self.recorder = QueueRecorder(server_cfg.recorder_dir, self.tx_que, self.rx_que, prefix=server_cfg.recorder_prefix)
+        self.tx_ring = ShmRing(DEFAULT_RECORDER_RING_SLOTS, STATE_STRUCT.size)
+        self.rx_ring = ShmRing(DEFAULT_RECORDER_RING_SLOTS, CMD_STRUCT.size)
+        self.recorder = ShmRecorder(server_cfg.recorder_dir, self.tx_ring, self.rx_ring, prefix=server_cfg.recorder_prefix,
+                                     core=server_cfg.recorder_core)
         self.state = "READY"
         
     def rx_loop(self) -> None:
+        pin_current_thread("rx", self.rx_core)
+        # Bound once: the loop body does no attribute lookups on self
+        stopped = self.terminate_event.is_set
+        recv_batch = self.udp_rx.try_recv_batch
+        handle_cmd = self.handle_cmd
+        push = self.rx_ring.push
+        perf_counter = time.perf_counter
+        pkt_size = CMD_STRUCT.size
         try:
-            while not self.terminate_event.is_set():
-                pkt = self.udp_rx.try_recv_pkt(timeout=0.1, pct_size=CMD_STRUCT.size)
-                if pkt is None:
-                    continue
-                try:
-                    cmd = self.handle_cmd(pkt)
-                    self.rx_que.put_nowait(cmd)
-                except Exception as exc:
-                    log.warn(f"handle_cmd failed: {exc}")
+            while not stopped():
+                # Every CMD queued since the last wakeup, read with one recvmmsg();
+                # blocks until a CMD arrives or stop() wakes the shutdown socket
+                pkts = recv_batch(None, pkt_size, DEFAULT_RX_BUSY_POLL_US)
+                if not pkts:
+                    continue  # shutdown wakeup (terminate is already set) or only malformed pkts
+                # One clock read per wakeup: every CMD of the batch arrived by now, and the
+                # same stamp feeds the CMD timeout, the print gate and the recorder slot
+                now = perf_counter()
+                for pkt in pkts:
+                    try:
+                        handle_cmd(pkt, now)
+                        push(pkt, now)
+                    except Exception as exc:
+                        log.warn(f"handle_cmd failed: {exc}")
 
         except Exception as exc:
             log.error(f"RX stopped: {exc}")
-            self.terminate_event.set()
+            self.stop()
 
     def tx_loop(self) -> None:
+        pin_current_thread("tx", self.tx_core, self.tx_nice, self.tx_fifo_prio)
         dt = 1.0 / self.tx_hz
-        next_time = time.perf_counter()
+        timer = PeriodicTimer(dt)
+        stopped = self.terminate_event.is_set
+        wait = timer.wait
+        handle_state = self.handle_state
+        send_pkt = self.udp_tx.send_pkt
+        push = self.tx_ring.push
+        handle_timeout_if_needed = self.handle_timeout_if_needed
+        # The CMD timeout rides on the TX tick: an integer countdown, no extra thread or clock read
+        check_every = max(1, int(self.tx_hz * DEFAULT_CMD_TIMEOUT_CHECK_S))
+        ticks_to_check = check_every
         try:
-            while not self.terminate_event.is_set():
-                now = time.perf_counter()
-                if now < next_time:
-                    time.sleep(next_time - now)
-                    continue
-                next_time += dt
-
-                pkt, state = self.handle_state()
-                self.udp_tx.send_pkt(pkt)
-                self.tx_que.put_nowait(state)
+            while not stopped():
+                ticks_to_check -= wait()
+                pkt, t_mono = handle_state()
+                send_pkt(pkt)
+                push(pkt, t_mono)
+                if ticks_to_check <= 0:
+                    ticks_to_check = check_every
+                    handle_timeout_if_needed()
 
         except Exception as exc:
             log.error(f"Tx loop stopped: {exc}")
-            self.terminate_event.set()
+            self.stop()
+        finally:
+            timer.close()
+            self.udp_tx.flush()
 
-    def cmd_timeout_loop(self) -> None:
-        try:
-            while not self.terminate_event.is_set():
-                self.handle_timeout_if_needed()
-                time.sleep(1)
-        except Exception as exc:
-            log.error(f"CMD timeout loop stopped: {exc}")
-            self.terminate_event.set()
-    
     def info_server_thread(self):
-        import socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM | SOCK_NONBLOCK)
+        if not SOCK_NONBLOCK:
+            sock.setblocking(False)
         host = "127.0.0.1"
         sock.bind((host, self.info_port))
-        sock.settimeout(1.0)
         log.info(f"Status UDP listening on {host}:{self.info_port}")
 
         try:
             while not self.terminate_event.is_set():
-                
+                # Block until a request arrives or the shutdown socket is signalled
+                readable, _, _ = select.select([sock, _shutdown_r], [], [])
+                if sock not in readable:
+                    break
                 try:
                     data, addr = sock.recvfrom(256)
-                except socket.timeout:
+                except BlockingIOError:
                     continue
                 except Exception as e:
-                    lof.info("Status server error:", e)
+                    log.info(f"Status server error: {e}")
                     continue
 
                 msg = data.decode(errors="ignore").strip().lower()
@@ -168,7 +220,7 @@ class Server:
                     reply = self.info().encode()
                 elif msg in ("stop", "exit"):
                     log.info("stop message recived over the INFO port")
-                    self.terminate_event.set()
+                    self.stop()
                     self.state = "EXITING"
                     reply = self.info().encode()
                 else:
@@ -181,7 +233,7 @@ class Server:
             
         except Exception as exc:
             log.error(f"Info loop stopped: {exc}")
-            self.terminate_event.set()
+            self.stop()
     
     def info(self) -> str:
         now = time.time()
@@ -190,32 +242,34 @@ class Server:
         return (f"state={self.state} uptime_s={uptime:.1f}")
     
     def run(self):
-        global running
-        running = True
         self.recorder.start()
         self.t_rx = threading.Thread(target=self.rx_loop, daemon=True)
         self.t_tx = threading.Thread(target=self.tx_loop, daemon=True)
         self.t_info = threading.Thread(target=self.info_server_thread, daemon=True)
-        self.t_timeout = threading.Thread(target=self.cmd_timeout_loop, daemon=True)
         self.state = "RUNNING"
         self.t_rx.start()
         self.t_tx.start()
         self.t_info.start()
-        self.t_timeout.start()
     
-        while not self.terminate_event.is_set() and running:
-            time.sleep(self.idle_sleep_s)
+        while not self.terminate_event.is_set():
+            # No polling: sleeps until _stop() or stop() writes the shutdown byte
+            select.select([_shutdown_r], [], [])
         self.close()
         
+    def stop(self) -> None:
+        self.terminate_event.set()
+        _wake_all()
+
     def close(self) -> None:
         log.info("closing the server")
-        self.terminate_event.set()
+        self.stop()
         self.t_rx.join()
         self.t_tx.join()
         self.t_info.join()
-        self.t_timeout.join()
         self.recorder.stop()
         self.recorder.join()
+        self.tx_ring.close()
+        self.rx_ring.close()
         
     def __del__(self) -> None:
         self.close()
@@ -229,15 +283,22 @@ class HandleStates:
         self.seq = 0
         self.print_interval_s = print_interval_s
         self.bot = bot
+        # Reused every tick; the caller sends/copies it before the next handle()
+        self.pkt = bytearray(STATE_STRUCT.size)
+        # Filled from self.pkt only when a print is due, so the console shows the sample that was sent
+        self._print_state = States()
     
-    def handle(self) -> tuple[bytes, States]:
+    def handle(self) -> tuple[bytearray, float]:
+        # Returns the packet and its t_mono so the recorder reuses the stamp instead of re-reading the clock
         self.seq += 1
-        state = read_state(self.bot)
-        state.seq = self.seq
         t_mono = time.perf_counter()
-        pkt = prepare_state_pkt(state, t_mono)
-        self.last_printed = _maybe_print(self.last_printed, lambda: print_states(state), self.print_interval_s)
-        return pkt, state
+        read_state_pkt_into(self.bot, self.pkt, self.seq, t_mono)
+        # The rate-limited console print decodes the packet just packed (no second board read)
+        if _print_due(self.last_printed, t_mono, self.print_interval_s):
+            self.last_printed = t_mono
+            parse_state_pkt_into(self._print_state, self.pkt)
+            print_states(self._print_state)
+        return self.pkt, t_mono
     
 class HandleActions:
     def __init__(self, bot: Rosmaster,  print_interval_s: float,  cmd_timeout_s: float):
@@ -246,18 +307,22 @@ class HandleActions:
         self.cmd_timeout_s = cmd_timeout_s
         self.bot = bot
         self.last_cmd_time = 0.0
+        self.actions = Actions()  # reused for every CMD pkt
 
-    def handle(self, pkt: bytes) -> Actions:
-        self.last_cmd_time = time.time()
-        actions = parse_cmd_pkt(pkt)
+    def handle(self, pkt: bytes, now: float) -> Actions:
+        # now is the caller's perf_counter() read for this receive batch
+        self.last_cmd_time = now
+        actions = parse_cmd_pkt_into(self.actions, pkt)
         apply_actions(self.bot, actions)
-        self.last_printed = _maybe_print(self.last_printed, lambda: print_actions(actions), self.print_interval_s)
+        if _print_due(self.last_printed, now, self.print_interval_s):
+            self.last_printed = now
+            print_actions(actions)
         return actions
     
     def handle_timeout_if_needed(self):
         if self.cmd_timeout_s <=0:
             return
-        age = time.time() - self.last_cmd_time
+        age = time.perf_counter() - self.last_cmd_time
         if age > self.cmd_timeout_s:
             try:
                 actions = Actions()
@@ -276,6 +341,8 @@ def main() -> None:
     handle_actions = HandleActions(bot, print_interval_s=DEFAULT_PRINT_INTERVAL_S, cmd_timeout_s=cfg.timing.cmd_timeout_s)
     
     log.info("UDP server starting")
+    # Threads pin themselves when they start, so this only moves the main and info threads
+    pin_current_thread("main", cfg.threading.main_core)
     server = Server(
             handle_state.handle,
             handle_actions.handle,